@@ -3,11 +3,14 @@ from __future__ import annotations
 import asyncio
 import logging
 
+import aiohttp
 import discord
 from discord.ext import commands
 
 from .config import cfg
 from .utils.logging import get_logger
+from .utils.concurrency import shutdown_llm_pool, to_llm_thread
+from .utils import persistence as pers
 
 
 log = get_logger(__name__)
@@ -18,45 +21,83 @@ class PersonaBot(commands.Bot):
         intents = discord.Intents.default()
         intents.message_content = True  # must be enabled in Dev Portal too
         super().__init__(command_prefix="!", intents=intents)
+        self._prewarm_task: asyncio.Task | None = None
+
+    async def login(self, token: str) -> None:
+        # One keep-alive connection pool for all REST traffic. Webhooks fetched/created via the
+        # channel are state-bound and send through this same session, so sends reuse warm
+        # connections instead of paying a TCP/TLS handshake after discord.py's 15s idle default.
+        if self.http.connector is discord.utils.MISSING:
+            self.http.connector = aiohttp.TCPConnector(limit=256, limit_per_host=64, keepalive_timeout=75)
+        await super().login(token)
 
     async def setup_hook(self):
+        # Warm persona/active-map cache in one directory pass so first mentions skip disk parses
+        n = await asyncio.to_thread(pers.preload_personas)
+        log.info("Preloaded %d personas", n)
         # Load persona cog
         from .commands import persona as persona_mod
         from .commands import mention_speak as mention_mod
+        from .commands import ping as ping_mod
 
         await persona_mod.setup(self)
         await mention_mod.setup(self)
+        await ping_mod.setup(self)
         # Sync slash commands (guild-scoped only)
         if cfg.guild_id:
             guild = discord.Object(id=int(cfg.guild_id))
             await self.tree.sync(guild=guild)
             log.info("Synced commands to guild %s", cfg.guild_id)
         else:
-            # Intentionally skipping global sync to keep commands guild-scoped only.
-            log.warning("GUILD_ID not set; skipping command sync. Set DISCORD_GUILD_ID or GUILD_ID in .env.")
+            # Persona commands stay guild-scoped only; publish just the /ping health check
+            # globally (as the standalone hello_bot did) so it still works without a guild
+            for cmd in self.tree.get_commands():
+                if cmd.name != "ping":
+                    self.tree.remove_command(cmd.name)
+            await self.tree.sync()
+            log.warning(
+                "GUILD_ID not set; synced only /ping globally (may take up to 1 hour). "
+                "Set DISCORD_GUILD_ID or GUILD_ID in .env for the persona commands."
+            )
 
     async def on_ready(self):
         log.info("Bot ready as %s (%s)", self.user, getattr(self.user, 'id', ''))
         # Optional non-blocking prewarm to reduce first-token latency
         from .config import cfg as _cfg
         if _cfg.prewarm_llm:
-            import asyncio
+            # on_ready fires again after reconnects; never run two prewarms at once
+            if self._prewarm_task is not None and not self._prewarm_task.done():
+                return
             from .llm.local_client import client as _llm
 
             async def _prewarm():
                 try:
                     # Run in a thread to avoid blocking the event loop
-                    await asyncio.to_thread(_llm.complete, "ok", max_tokens=8)
+                    await to_llm_thread(_llm.complete, "ok", max_tokens=8)
                     log.info("LLM prewarm completed")
                 except Exception as e:
                     log.info("LLM prewarm skipped: %s", e)
 
-            asyncio.create_task(_prewarm())
+            # Keep a reference so the task isn't garbage-collected mid-flight
+            self._prewarm_task = asyncio.create_task(_prewarm())
+
+    async def close(self):
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+        await super().close()
+        shutdown_llm_pool()
 
 
 def main():
     if not cfg.discord_token:
         raise SystemExit("DISCORD_TOKEN not set in .env")
+    try:
+        # libuv-backed loop for the gateway/REST/webhook socket work; optional (not on Windows)
+        import uvloop  # type: ignore
+
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
     bot = PersonaBot()
     bot.run(cfg.discord_token)
 
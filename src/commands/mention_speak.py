@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Deque, Dict, List, Tuple
-from collections import deque
+import random
+import re
+import time
+from typing import Deque, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
 
 import discord
 from discord.ext import commands
@@ -11,28 +14,83 @@ from ..config import cfg, INDEX_DIR
 from ..utils.logging import get_logger
 from ..utils import persistence as pers
 from ..rag.retriever import Retriever
+from ..rag.batching import EmbedBatcher
+from ..rag.semcache import SemanticResponseCache
 from ..llm.local_client import client as llm
-from ..llm.prompting import build_speak_prompt
+from ..llm.prompting import build_speak_prefix, build_speak_prompt, cached_persona_style
 from ..utils.webhook import send_via_webhook
-from ..utils.concurrency import SpeakGuard
+from ..utils.concurrency import SpeakGuard, to_llm_thread
 
 
 log = get_logger(__name__)
 
 
-Turn = Tuple[str, str]  # (role, content) where role in {"user","assistant"}
+class SessionBuf:
+    """Rolling per-channel conversation window, kept as pre-formatted prompt lines."""
+
+    __slots__ = ("lines", "_rendered")
+
+    def __init__(self, maxlen: int):
+        self.lines: Deque[str] = deque(maxlen=max(1, maxlen))
+        self._rendered: Optional[str] = ""
+
+    def append(self, tag: str, content: str) -> None:
+        self.lines.append(f"{tag}: {content}")
+        self._rendered = None
+
+    def render(self) -> str:
+        if self._rendered is None:
+            self._rendered = "\n".join(self.lines)
+        return self._rendered
+
+_RETRIEVER_CACHE_MAX = 64
+_VOWEL_RE = re.compile(r"([aeiouAEIOU])")
+_MENTION_RE = re.compile(r"<@[!&]?\d+>")
+_CHEAP_PAT = re.compile(r"^\s*(hi|hello|hey|ping|yo)[\s!.?]*$", re.I)
 
 
 class MentionSpeakCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.sessions: Dict[int, Deque[Turn]] = {}
+        self.sessions: Dict[int, SessionBuf] = {}
+        # Loaded indexes per persona uid (LRU); avoids reloading from disk per mention
+        self._retrievers: OrderedDict[int, Retriever] = OrderedDict()
+        self._rng = random.Random()
+        # uid -> (persona doc it was built from, username, speak prompt prefix)
+        self._prefix_cache: Dict[int, Tuple[dict, str, str]] = {}
+        self._bot_user_id: Optional[int] = None
+        # Concurrent mentions share one embedding round trip for their queries
+        self._embedder = EmbedBatcher(llm.embed_query, runner=to_llm_thread)
+        # Replies to near-duplicate mentions, keyed by the same query embedding retrieval uses
+        self._semcache: Optional[SemanticResponseCache] = (
+            SemanticResponseCache(cfg.semcache_threshold, cfg.semcache_ttl_seconds, cfg.semcache_max_entries)
+            if cfg.semcache_enabled
+            else None
+        )
 
-    def _get_session(self, channel_id: int) -> Deque[Turn]:
+    def _get_session(self, channel_id: int) -> SessionBuf:
         if channel_id not in self.sessions:
-            self.sessions[channel_id] = deque(maxlen=cfg.session_max_turns)
+            # Prompt shows the last (session_max_turns - 1) lines, so only keep that many
+            self.sessions[channel_id] = SessionBuf(cfg.session_max_turns - 1)
         return self.sessions[channel_id]
 
+    def _get_retriever(self, uid: int) -> Retriever:
+        retr = self._retrievers.get(uid)
+        if retr is not None:
+            self._retrievers.move_to_end(uid)
+            return retr
+        retr = Retriever(INDEX_DIR / f"{uid}.idx", embed_fn=llm.embed)
+        self._retrievers[uid] = retr
+        if len(self._retrievers) > _RETRIEVER_CACHE_MAX:
+            self._retrievers.popitem(last=False)
+        return retr
+
+    def invalidate(self, uid: int) -> None:
+        """Drop the cached retriever (and cached replies) for a persona so the next mention reloads its index."""
+        self._retrievers.pop(int(uid), None)
+        if self._semcache is not None:
+            self._semcache.invalidate(uid)
+
     def _postprocess_by_traits(self, text: str, pdata: dict) -> List[str]:
         # Light-touch adjustments to reflect punctuation and burst habits.
         ts = pdata.get("text_style", {})
@@ -51,14 +109,8 @@ class MentionSpeakCog(commands.Cog):
 
         # Occasional elongated words if indicated
         if "elongated" in typos or "typos" in typos:
-            import re, random
-
-            def elongate(m):
-                ch = m.group(1)
-                return ch * random.randint(2, 4)
-
-            if random.random() < 0.35:
-                out = re.sub(r"([aeiouAEIOU])", elongate, out, count=1)
+            if self._rng.random() < 0.35:
+                out = _VOWEL_RE.sub(self._elongate, out, count=1)
 
         if bursts.startswith("often"):
             # Split on sentences into up to 2-3 bursts
@@ -67,117 +119,237 @@ class MentionSpeakCog(commands.Cog):
                 return [parts[0] + ".", " ".join(parts[1:])]
         return [out]
 
+    def _cheap_reply(self, word: str, pdata: dict) -> str:
+        # Canned greeting shaped by the persona's capitalization/punctuation habits
+        ts = pdata.get("text_style", {})
+        word = word.lower()
+        out = "pong" if word == "ping" else word
+        if (ts.get("capitalization") or "") != "always lowercase":
+            out = out.capitalize()
+        return out + ("!!" if "frequent" in (ts.get("punctuation") or "") else "!")
+
+    def _speak_prefix(self, uid: int, username: str, pdata: dict) -> str:
+        # Pure function of the persona doc; reuse while persistence serves the same cached dict
+        hit = self._prefix_cache.get(uid)
+        if hit is not None and hit[0] is pdata and hit[1] == username:
+            return hit[2]
+        prefix = build_speak_prefix(username, cached_persona_style(pdata))
+        self._prefix_cache[uid] = (pdata, username, prefix)
+        return prefix
+
+    def _elongate(self, m: re.Match) -> str:
+        return m.group(1) * self._rng.randint(2, 4)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self._bot_user_id = self.bot.user.id if self.bot.user else None
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         if not cfg.enable_mention_speak:
             return
+        # Only respond when bot is mentioned (mentions also covers replies with ping on);
+        # the list is already parsed and usually empty, so most messages exit here
+        if not message.mentions:
+            return
+        if self._bot_user_id is None:
+            if self.bot.user is None:
+                return
+            self._bot_user_id = self.bot.user.id
+        bid = self._bot_user_id
+        if not any(u.id == bid for u in message.mentions):
+            return
         if message.author.bot:
             return
         if not message.guild:
             return
-        # Only respond when bot is mentioned
-        if not any(u.id == self.bot.user.id for u in message.mentions):  # type: ignore
-            return
 
         # Require active persona for the channel
         active = pers.get_active_persona_map()
         uid = active.get(str(message.channel.id))
         if not uid:
             return await message.reply("No active persona here. Use /persona switch @user first.")
-        pdata = pers.read_json(pers.persona_path(uid)) or {}
+        pdata = pers.read_json_cached(pers.persona_path(uid)) or {}
         username = pdata.get("username", str(uid))
 
-        # Indicate typing early to show progress
-        try:
-            await message.channel.trigger_typing()
-        except Exception:
-            pass
+        # Fast path: bare greetings/pings skip retrieval, the LLM, and session history
+        if cfg.mention_fast_replies:
+            cheap = _CHEAP_PAT.match(_MENTION_RE.sub("", message.content))
+            if cheap:
+                avatar_url = await self._resolve_avatar(message, uid, pdata)
+                await self._send_part(message, self._cheap_reply(cheap.group(1), pdata), username, avatar_url)
+                return
+
+        # Member lookup may hit REST; overlap it with retrieval and generation
+        avatar_task = asyncio.create_task(self._resolve_avatar(message, uid, pdata))
 
         # Session context
         sess = self._get_session(message.channel.id)
-        sess.append(("user", message.clean_content))
+        # clean_content re-resolves mentions on every access; compute it once
+        user_text = message.clean_content
+        sess.append("User", user_text)
 
         # Retrieval (offload to thread to avoid blocking event loop)
-        index_path = INDEX_DIR / f"{uid}.idx"
-        retr = Retriever(index_path, embed_fn=llm.embed)
+        retr = self._get_retriever(uid)
         k = max(1, cfg.rag_k)
-        if retr.is_ready():
+        qv = None
+        retrieved = []
+        if retr.is_ready() or self._semcache is not None:
             try:
-                retrieved = await asyncio.to_thread(
-                    lambda: [t[: cfg.rag_snippet_max_chars] for t, _ in retr.query(message.clean_content, k=k)]
-                )
+                qv = await self._embedder.embed(user_text)
+                if retr.is_ready():
+                    retrieved = await to_llm_thread(
+                        lambda: [t[: cfg.rag_snippet_max_chars] for t, _ in retr.query_vector(qv, k=k)]
+                    )
             except Exception:
                 retrieved = []
-        else:
-            retrieved = []
-
-        # Build style (reuse persona speak path)
-        style_prompt = pdata.get("style_prompt", "")
-        from ..llm.prompting import rich_traits_to_style
-
-        rich_block = rich_traits_to_style(
-            username,
-            {
-                "text_style": pdata.get("text_style", {}),
-                "personality": pdata.get("personality", {}),
-                "conversation": pdata.get("conversation", {}),
-                "topics": pdata.get("topics", {}),
-                "media": pdata.get("media", {}),
-            },
-        )
-        combined_style = (style_prompt or "").strip()
-        if rich_block.strip():
-            combined_style = (combined_style + "\n\n" + rich_block).strip()
-        if len(combined_style) > cfg.style_max_chars:
-            combined_style = combined_style[: cfg.style_max_chars]
+        cached = self._semcache.lookup(uid, qv) if self._semcache is not None and qv is not None else None
 
         # Simple context window rendering
-        context_lines = []
-        for role, content in list(sess):
-            tag = "User" if role == "user" else username
-            context_lines.append(f"{tag}: {content}")
-        context_block = "\n".join(context_lines[- (cfg.session_max_turns - 1) :])
+        context_block = sess.render()
         if context_block:
             context_block = "\n\n[Conversation so far]\n" + context_block
 
-        sprompt = build_speak_prompt(username, combined_style + context_block, message.clean_content, retrieved)
-        # Concurrency guard to limit parallel LLM calls; keep UI responsive
-        async with SpeakGuard(message.channel.id):
-            async with message.channel.typing():
-                reply = await asyncio.to_thread(
-                    llm.complete,
-                    sprompt,
-                    max_tokens=cfg.speak_max_tokens,
-                    temperature=cfg.speak_temperature,
-                    num_ctx=cfg.speak_num_ctx,
-                )
-        sess.append(("assistant", reply))
+        sprompt = build_speak_prompt(
+            username, "", user_text, retrieved, prefix=self._speak_prefix(uid, username, pdata), context=context_block
+        )
+        # Concurrency guard to limit parallel LLM calls; typing starts only once we hold it,
+        # so queued mentions don't each keep a typing keepalive running
+        streamed_msg = None
+        prefix = ""
+        if cached is not None:
+            reply = cached
+        else:
+            async with SpeakGuard(message.channel.id):
+                async with message.channel.typing():
+                    if cfg.speak_stream:
+                        reply, streamed_msg, prefix = await self._stream_reply(message, sprompt, username, avatar_task)
+                    else:
+                        reply = await to_llm_thread(
+                            llm.complete,
+                            sprompt,
+                            max_tokens=cfg.speak_max_tokens,
+                            temperature=cfg.speak_temperature,
+                            num_ctx=cfg.speak_num_ctx,
+                        )
+            # Don't cache backend-down stubs
+            if self._semcache is not None and qv is not None and not reply.startswith("[stubbed LLM]"):
+                self._semcache.store(uid, qv, reply)
+        sess.append(username, reply)
+        avatar_url = await avatar_task
 
         # Punctuation/burst-aware sending
         parts = self._postprocess_by_traits(reply, pdata)
-        # Try webhook with persona-styled display name; fallback to channel.send
-        avatar_url = None
+        if streamed_msg is not None:
+            # First burst replaces the streamed draft; remaining bursts follow as new messages
+            try:
+                await streamed_msg.edit(content=prefix + parts[0])
+            except Exception:
+                pass
+            parts = parts[1:]
+        for i, part in enumerate(parts):
+            if i > 0 or streamed_msg is not None:
+                await asyncio.sleep(cfg.burst_send_delay_ms / 1000.0)
+            await self._send_part(message, part, username, avatar_url)
+
+    async def _resolve_avatar(self, message: discord.Message, uid: int, pdata: dict) -> Optional[str]:
+        # Saved on the persona doc at create/switch/update; fall back to a member lookup
+        if pdata.get("avatar_url"):
+            return pdata["avatar_url"]
         try:
-            mem = message.guild.get_member(uid) if message.guild else None
-            if not mem and message.guild:
-                mem = await message.guild.fetch_member(uid)
+            guild = message.guild
+            mem = guild.get_member(uid) if guild else None
+            if not mem and guild:
+                mem = await guild.fetch_member(uid)
             if mem and getattr(mem, "display_avatar", None):
-                avatar_url = mem.display_avatar.url  # type: ignore[attr-defined]
+                return mem.display_avatar.url  # type: ignore[attr-defined]
         except Exception:
             pass
-        for i, part in enumerate(parts):
-            if i > 0:
-                await asyncio.sleep(cfg.burst_send_delay_ms / 1000.0)
-            # Use webhook with name set at /persona switch; do not override per message
-            msg = await send_via_webhook(
-                message.channel,  # type: ignore[arg-type]
-                part,
-                username=None,
-                avatar_url=avatar_url,
-            )
+        return None
+
+    async def _send_part(
+        self, message: discord.Message, part: str, username: str, avatar_url: Optional[str]
+    ) -> Tuple[Optional[discord.Message], str]:
+        """Send one reply part; returns the sent message and the prefix used for it."""
+        # Use webhook with name set at /persona switch; do not override per message
+        msg = await send_via_webhook(
+            message.channel,  # type: ignore[arg-type]
+            part,
+            username=None,
+            avatar_url=avatar_url,
+        )
+        if msg:
+            return msg, ""
+        prefix = f"Persona Bot (@{username}) "
+        try:
+            return await message.channel.send(prefix + part), prefix
+        except Exception:
+            return None, prefix
+
+    async def _stream_reply(
+        self, message: discord.Message, sprompt: str, username: str, avatar_task: "asyncio.Task[Optional[str]]"
+    ) -> Tuple[str, Optional[discord.Message], str]:
+        """Stream the reply into a single message, editing it as tokens arrive.
+
+        The blocking stream runs in a worker thread and pushes deltas into an
+        asyncio.Queue; this coroutine drains the queue and coalesces edits so the
+        event loop is never blocked on generation.
+        Returns (final_text, streamed_message_or_None, prefix_used_by_that_message).
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+        def on_delta(s: str):
+            loop.call_soon_threadsafe(queue.put_nowait, s)
+
+        def _produce() -> str:
+            try:
+                return llm.complete_stream(
+                    sprompt,
+                    on_delta,
+                    time_budget_sec=float(cfg.speak_time_budget_seconds),
+                    max_tokens=cfg.speak_max_tokens,
+                    temperature=cfg.speak_temperature,
+                    num_ctx=cfg.speak_num_ctx,
+                )
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+        producer = asyncio.ensure_future(to_llm_thread(_produce))
+        msg: Optional[discord.Message] = None
+        prefix = ""
+        buf: List[str] = []
+        buf_len = 0  # running len("".join(buf)); join only when an edit is due
+        shown = 0  # chars of buf already visible in msg
+        last_edit = 0.0
+        while True:
+            tok = await queue.get()
+            if tok is None:
+                break
+            buf.append(tok)
+            buf_len += len(tok)
+            now = time.monotonic()
+            if (now - last_edit) * 1000.0 < cfg.stream_edit_interval_ms:
+                continue
+            if buf_len - shown < cfg.stream_min_chunk_chars:
+                continue
+            content = "".join(buf)
+            if not content.strip():
+                continue
             if msg is None:
-                tag = f"Persona Bot (@{username})"
-                await message.channel.send(f"{tag} {part}")
+                msg, prefix = await self._send_part(message, content, username, await avatar_task)
+                if msg is None:
+                    # Could not post a draft; drain the stream and send normally afterwards
+                    break
+            else:
+                try:
+                    await msg.edit(content=prefix + content)
+                except Exception:
+                    pass
+            shown = len(content)
+            last_edit = time.monotonic()
+        reply = await producer
+        return reply, msg, prefix
 
 
 async def setup(bot: commands.Bot):
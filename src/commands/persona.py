@@ -1,41 +1,135 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Optional, List
 
 import discord
 from discord import app_commands
 from discord.ext import commands
+import numpy as np
 
 from ..config import cfg, INDEX_DIR
 from ..utils.logging import get_logger
 from ..utils import persistence as pers
 from ..ingest.discord_fetch import (
     fetch_recent_messages_from_channel,
-    fetch_texts_and_image_urls_from_channel,
-    fetch_texts_and_image_urls_multi,
-    fetch_image_items_from_channel,
-    fetch_image_items_multi,
+    fetch_texts_and_image_items_multi,
 )
-from ..ingest.preprocess import clean_texts, extract_basic_traits, extract_rich_traits
+from ..ingest.preprocess import clean_texts, extract_basic_traits, extract_media_keywords, extract_rich_traits
 from ..llm.local_client import client as llm
 from ..llm.prompting import (
+    build_beliefs_inference_prompt,
+    build_merge_style_prompt,
+    build_merge_summaries_prompt,
     build_persona_creation_prompt,
     build_speak_prompt,
     build_summarize_prompt,
+    cache_persona_style,
+    cached_persona_style,
+    rich_traits_to_style,
     style_from_traits,
 )
 from ..rag.retriever import Retriever
+from ..rag.batching import EmbedBatcher
 from ..utils.webhook import send_via_webhook, ensure_channel_webhook_named
 from ..utils.progress import bar as progress_bar
 from ..utils import caption_cache as capcache
+from ..utils.concurrency import SpeakGuard, sem_gather
 
 
 log = get_logger(__name__)
 
 
+def _extract_traits(texts: List[str], media_captions: List[str]) -> tuple[dict, dict]:
+    # Pure-Python text stats over up to CREATE_MSG_FETCH_LIMIT messages; callers run it in a thread
+    return extract_basic_traits(texts), extract_rich_traits(texts, media_captions=media_captions)
+
+
+async def _stream_into(msg, prompt: str, *, prefix: str = "", **kw) -> str:
+    """Stream llm.complete_stream(prompt, **kw) into msg, editing it as text arrives.
+
+    on_delta runs in the worker thread; deltas are handed to the loop, where a single
+    worker applies edits in order. The one-slot queue coalesces: while an edit is in
+    flight further deltas only mark the message dirty. Returns the full text.
+    """
+    loop = asyncio.get_running_loop()
+    parts: List[str] = []
+    pending = 0  # chars received since the last edit was queued
+    edit_queue: asyncio.Queue[bool] = asyncio.Queue(maxsize=1)
+
+    def _push(s: str) -> None:
+        nonlocal pending
+        parts.append(s)
+        pending += len(s)
+        if pending >= cfg.stream_min_chunk_chars and not edit_queue.full():
+            pending = 0
+            edit_queue.put_nowait(True)
+
+    def on_delta(s: str):
+        loop.call_soon_threadsafe(_push, s)
+
+    async def edit_worker():
+        interval = max(0, cfg.stream_edit_interval_ms) / 1000.0
+        last_edit = 0.0
+        while await edit_queue.get():
+            wait = last_edit + interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                await msg.edit(content=prefix + "".join(parts))
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    await asyncio.sleep(float(e.response.headers.get("Retry-After", "1")))
+            except Exception:
+                pass
+            last_edit = time.monotonic()
+
+    editor = asyncio.create_task(edit_worker())
+    try:
+        text = await asyncio.to_thread(llm.complete_stream, prompt, on_delta, **kw)
+    finally:
+        # Drop any queued edit and let an in-flight one land before the final edit
+        if edit_queue.full():
+            edit_queue.get_nowait()
+        edit_queue.put_nowait(False)
+        await editor
+    # Final edit with the complete text
+    try:
+        if text:
+            await msg.edit(content=prefix + text)
+    except Exception:
+        pass
+    return text
+
+
 class PersonaCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        # Overlapping /persona speak calls share embedding round trips for queries and drafts
+        self._embedder = EmbedBatcher(llm.embed_query)
+
+    def _invalidate_retriever(self, uid: int) -> None:
+        # Mention cog caches loaded indexes; make it reload after we rewrite one
+        cog = self.bot.get_cog("MentionSpeakCog")
+        if cog is not None and hasattr(cog, "invalidate"):
+            cog.invalidate(uid)
+
+    async def _resolve_avatar(self, interaction: discord.Interaction, pdata: dict, uid: int) -> Optional[str]:
+        # Prefer the URL saved at create/switch; only look the member up for older docs
+        url = pdata.get("avatar_url")
+        if url:
+            return url
+        try:
+            if interaction.guild:
+                mem = interaction.guild.get_member(uid) or await interaction.guild.fetch_member(uid)
+                if mem and getattr(mem, "display_avatar", None):
+                    return mem.display_avatar.url
+        except Exception:
+            pass
+        return None
 
     persona = app_commands.Group(name="persona", description="Manage AI personas")
 
@@ -49,15 +143,14 @@ class PersonaCog(commands.Cog):
             return await interaction.followup.send("Message Content intent is disabled. Cannot read history.")
 
         # Quick path: compute and save initial persona, then finalize in background
-        import asyncio as _asyncio, time as _time
-        start_ts = _time.monotonic()
+        start_ts = time.monotonic()
 
-        texts, image_urls = await fetch_texts_and_image_urls_from_channel(channel, user, limit=cfg.create_msg_fetch_limit)
-        if not texts and not image_urls:
+        # One history pass for both texts and image items (_finalize captions the items)
+        texts, image_items = await fetch_texts_and_image_items_multi(channel, {user.id}, limit=cfg.create_msg_fetch_limit)
+        if not texts and not image_items:
             return await interaction.followup.send("No recent messages found from that user in this channel.")
-        texts = clean_texts(texts)
-        traits = extract_basic_traits(texts)
-        rich_traits = extract_rich_traits(texts, media_captions=[])
+        texts = await asyncio.to_thread(clean_texts, texts)
+        traits, rich_traits = await asyncio.to_thread(_extract_traits, texts, [])
         base_style = style_from_traits(user.display_name, traits)
         doc = {
             "user_id": user.id,
@@ -73,8 +166,11 @@ class PersonaCog(commands.Cog):
             "culture": rich_traits.get("culture", {}),
             "media": {},
             "examples": [],
+            "avatar_url": user.display_avatar.url,
         }
-        pers.write_json(pers.persona_path(user.id), doc)
+        cache_persona_style(doc)
+        # Initial write makes the persona usable right away; _finalize updates `doc` and writes once more
+        await pers.awrite_json(pers.persona_path(user.id), doc)
 
         # Post immediate progress message in channel
         prog_msg = None
@@ -90,49 +186,48 @@ class PersonaCog(commands.Cog):
                 # Optionally skip images entirely for speed
                 captions: List[str] = []
                 if cfg.create_include_images:
-                    try:
-                        items = await fetch_image_items_from_channel(channel, user, limit=cfg.create_msg_fetch_limit)
-                    except Exception:
-                        items = [{"url": u, "text": "", "filename": ""} for u in image_urls]
+                    items = image_items
+                    # Same image posted twice only needs one caption
+                    seen: set[str] = set()
+                    items = [it for it in items if not (it.get("url") in seen or seen.add(it.get("url")))]
                     items = items[: max(0, cfg.create_image_captions)]
-                    sem = _asyncio.Semaphore(max(1, cfg.create_caption_concurrency))
 
                     async def _cap(it: dict):
-                        async with sem:
-                            try:
-                                c = await _asyncio.to_thread(
-                                    llm.vision_describe,
-                                    it.get("url", ""),
-                                    hint=(it.get("text") or None),
-                                    filename=(it.get("filename") or None),
-                                )
-                                if c and cfg.caption_refine:
-                                    rp = (
-                                        "Refine this image caption to be strictly factual and grounded in any context text."
-                                        " Remove any guesses. If unsure, say 'uncertain'.\n"
-                                        f"Caption: {c}\nContext: {it.get('text','')}"
-                                    )
-                                    c = await _asyncio.to_thread(
-                                        llm.complete,
-                                        rp,
-                                        max_tokens=cfg.caption_refine_max_tokens,
-                                        temperature=0.2,
-                                        top_p=0.5,
-                                    )
-                                if c:
-                                    captions.append(c)
-                            except Exception:
-                                return
+                        url = it.get("url", "")
+                        try:
+                            c = await asyncio.to_thread(
+                                llm.vision_describe,
+                                it.get("vision_url") or url,
+                                hint=(it.get("text") or None),
+                                filename=(it.get("filename") or None),
+                                strict=cfg.caption_refine,
+                            )
+                            if c:
+                                captions.append(c)
+                                try:
+                                    if url:
+                                        capcache.set(url, c)
+                                except Exception:
+                                    pass
+                        except Exception:
+                            return
 
-                    await _asyncio.gather(*(_cap(it) for it in items))
+                    try:
+                        capcache.purge_expired()
+                    except Exception:
+                        pass
+                    # Shared with /persona summarize and update: cached value is the full (refined) caption
+                    cached = capcache.mget(it["url"] for it in items if it.get("url"))
+                    captions.extend(cached[it["url"]] for it in items if it.get("url") in cached)
+                    pending = [it for it in items if it.get("url") not in cached]
+                    await sem_gather(cfg.create_caption_concurrency, *(_cap(it) for it in pending))
 
                 # Refine style via LLM (hierarchical) and infer beliefs
-                from ..llm.prompting import build_merge_style_prompt, build_beliefs_inference_prompt
                 refined_style = None
                 try:
                     guides: List[str] = []
                     # Enforce time budget for style build
-                    now = _time.monotonic()
+                    now = time.monotonic()
                     remaining = max(0.0, cfg.create_time_budget_seconds - (now - start_ts))
                     do_hier = cfg.create_hierarchical and remaining > 30
                     if do_hier:
@@ -142,9 +237,12 @@ class PersonaCog(commands.Cog):
                         chunks = max(1, desired_chunks)
                         size = max(1, (len(recent_for_style) + chunks - 1) // chunks)
                         chunk_lists = [recent_for_style[i : i + size] for i in range(0, len(recent_for_style), size)]
-                        for idx, cl in enumerate(chunk_lists, start=1):
+                        done = 0
+
+                        async def _guide(cl: List[str]) -> str:
+                            nonlocal done
                             sp = build_persona_creation_prompt(user.display_name, cl)
-                            g = await _asyncio.to_thread(
+                            g = await asyncio.to_thread(
                                 llm.complete,
                                 sp,
                                 max_tokens=min((64 if remaining < 60 else cfg.create_chunk_max_tokens), cfg.create_max_tokens),
@@ -153,23 +251,23 @@ class PersonaCog(commands.Cog):
                                 top_p=cfg.create_top_p,
                                 model=cfg.create_model_name or cfg.text_model_name,
                             )
-                            guides.append(g)
+                            done += 1
                             if prog_msg:
                                 try:
-                                    pct = 20 + int(idx * 30 / max(1, len(chunk_lists)))
+                                    pct = 20 + int(done * 30 / max(1, len(chunk_lists)))
                                     await prog_msg.edit(content=f"Persona style building for @{user.display_name}: {progress_bar(pct)}")
                                 except Exception:
                                     pass
-                        media_keywords = []
-                        try:
-                            from ..ingest.preprocess import extract_rich_traits as _ert
+                            return g
 
-                            mk = _ert(texts, media_captions=captions).get("media", {}).get("keywords", [])
-                            media_keywords = mk if isinstance(mk, list) else []
+                        # Chunk guides are independent; run them concurrently (results stay in chunk order)
+                        guides = await sem_gather(cfg.create_llm_concurrency, *(_guide(cl) for cl in chunk_lists))
+                        try:
+                            media_keywords = extract_media_keywords(captions)
                         except Exception:
                             media_keywords = []
                         mp = build_merge_style_prompt(user.display_name, guides, media_keywords=media_keywords)
-                        refined_style = await _asyncio.to_thread(
+                        refined_style = await asyncio.to_thread(
                             llm.complete,
                             mp,
                             max_tokens=cfg.create_max_tokens,
@@ -180,7 +278,7 @@ class PersonaCog(commands.Cog):
                         )
                     else:
                         sprompt = build_persona_creation_prompt(user.display_name, texts[-cfg.create_style_msgs:])
-                        refined_style = await _asyncio.to_thread(
+                        refined_style = await asyncio.to_thread(
                             llm.complete,
                             sprompt,
                             max_tokens=cfg.create_max_tokens,
@@ -191,14 +289,14 @@ class PersonaCog(commands.Cog):
                         )
                 except Exception:
                     refined_style = None
-                doc_update = pers.read_json(pers.persona_path(user.id)) or {}
+                doc_update = doc
                 if refined_style and not refined_style.strip().startswith("[stubbed LLM]"):
                     doc_update["style_prompt"] = refined_style[: min(cfg.style_max_chars, 1200)]
                 doc_update["media"] = {"captions": captions[:20]}
                 # Beliefs inference (LLM JSON)
                 try:
                     bp = build_beliefs_inference_prompt(user.display_name, texts[-(cfg.create_style_msgs * 2):])
-                    bjson = await _asyncio.to_thread(
+                    bjson = await asyncio.to_thread(
                         llm.complete,
                         bp,
                         max_tokens=min(196, cfg.create_max_tokens),
@@ -206,8 +304,7 @@ class PersonaCog(commands.Cog):
                         top_p=0.9,
                         num_ctx=cfg.create_num_ctx,
                     )
-                    import json as _json
-                    data = _json.loads(bjson.strip().splitlines()[-1]) if bjson else {}
+                    data = json.loads(bjson.strip().splitlines()[-1]) if bjson else {}
                     if isinstance(data, dict):
                         beliefs = doc_update.get("beliefs") or {}
                         vals = data.get("values") if isinstance(data.get("values"), list) else []
@@ -220,7 +317,8 @@ class PersonaCog(commands.Cog):
                             doc_update["beliefs"] = beliefs
                 except Exception:
                     pass
-                pers.write_json(pers.persona_path(user.id), doc_update)
+                cache_persona_style(doc_update)
+                await pers.awrite_json(pers.persona_path(user.id), doc_update)
                 if prog_msg:
                     try:
                         await prog_msg.edit(content=f"Persona style enriched for @{user.display_name}. Indexing…")
@@ -231,7 +329,7 @@ class PersonaCog(commands.Cog):
                 index_path = INDEX_DIR / f"{user.id}.idx"
                 reps = texts[-cfg.create_index_snippets:]
                 # Cap index size based on remaining time budget estimate
-                now2 = _time.monotonic()
+                now2 = time.monotonic()
                 remaining2 = max(0.0, cfg.create_time_budget_seconds - (now2 - start_ts))
                 est_ms = max(10, cfg.create_embed_time_est_ms)
                 allowed = max(20, int((remaining2 * 1000) / est_ms))
@@ -240,15 +338,27 @@ class PersonaCog(commands.Cog):
                 retr = Retriever(index_path, embed_fn=llm.embed)
                 total = len(reps)
                 batch_size = max(8, min(64, cfg.embed_concurrency * 8))
-                for i in range(0, total, batch_size):
-                    batch = reps[i : i + batch_size]
-                    await _asyncio.to_thread(retr.add_texts, batch)
-                    pct = int(min(total, i + len(batch)) * 100 / max(1, total))
+                batches = [reps[i : i + batch_size] for i in range(0, total, batch_size)]
+                indexed = 0
+
+                async def _embed(batch: List[str]) -> np.ndarray:
+                    nonlocal indexed
+                    vecs = await asyncio.to_thread(retr.embed_batch, batch)
+                    indexed += len(batch)
+                    pct = int(indexed * 100 / max(1, total))
                     if prog_msg:
                         try:
-                            await prog_msg.edit(content=f"Indexing progress for @{user.display_name}: {progress_bar(pct)} ({min(total, i+len(batch))}/{total})")
+                            await prog_msg.edit(content=f"Indexing progress for @{user.display_name}: {progress_bar(pct)} ({indexed}/{total})")
                         except Exception:
                             pass
+                    return vecs
+
+                # Embedding dominates; overlap batches, then append and save the index once
+                vec_batches = await sem_gather(cfg.embed_concurrency, *(_embed(b) for b in batches))
+                if vec_batches:
+                    await asyncio.to_thread(retr.add_vectors, np.concatenate(vec_batches), reps)
+                    await asyncio.to_thread(retr.flush)
+                self._invalidate_retriever(user.id)
                 if prog_msg:
                     try:
                         await prog_msg.edit(content=f"Indexing complete for @{user.display_name}: {progress_bar(100)} ({total}/{total})")
@@ -260,18 +370,24 @@ class PersonaCog(commands.Cog):
                 except Exception:
                     pass
 
-        _asyncio.create_task(_finalize())
+        asyncio.create_task(_finalize())
 
-        elapsed = _time.monotonic() - start_ts
+        elapsed = time.monotonic() - start_ts
         await interaction.followup.send(
             f"Persona created for @{user.display_name} with initial style. Continuing enrichment and indexing in background (took {elapsed:.1f}s)."
         )
 
     @persona.command(name="switch", description="Set the active persona for this channel")
     async def persona_switch(self, interaction: discord.Interaction, user: discord.Member):
-        if not pers.read_json(pers.persona_path(user.id)):
+        pdata = await pers.aread_json(pers.persona_path(user.id))
+        if not pdata:
             return await interaction.response.send_message("Persona not found. Run /persona create first.", ephemeral=True)
-        pers.set_active_persona(interaction.channel_id, user.id)
+
+        await asyncio.to_thread(pers.set_active_persona, interaction.channel_id, user.id)
+        # Remember the avatar so speak paths never need a member lookup
+        avatar_url = user.display_avatar.url
+        if pdata.get("avatar_url") != avatar_url:
+            await pers.awrite_json(pers.persona_path(user.id), {**pdata, "avatar_url": avatar_url})
         # Try to rename (or create) the channel webhook to reflect the active persona
         try:
             if isinstance(interaction.channel, (discord.TextChannel, discord.Thread)):
@@ -286,25 +402,25 @@ class PersonaCog(commands.Cog):
     @persona.command(name="speak", description="Speak using the current active persona")
     async def persona_speak(self, interaction: discord.Interaction, prompt: str):
         await interaction.response.defer(thinking=True)
-        active_map = pers.get_active_persona_map()
+
+        active_map = await asyncio.to_thread(pers.get_active_persona_map)
         uid = active_map.get(str(interaction.channel_id))
         if not uid:
             return await interaction.followup.send("No active persona. Use /persona switch @user first.")
-        pdata = pers.read_json(pers.persona_path(uid))
+        pdata = await pers.aread_json(pers.persona_path(uid))
         if not pdata:
             return await interaction.followup.send("Active persona data missing. Re-create it.")
 
         # Concurrency guard
-        from ..utils.concurrency import SpeakGuard
-        import asyncio, time
         async with SpeakGuard(interaction.channel_id if interaction.channel_id else None):
             index_path = INDEX_DIR / f"{uid}.idx"
             retr = Retriever(index_path, embed_fn=llm.embed)
             k = max(1, cfg.rag_k)
             if retr.is_ready():
                 try:
+                    qv = await self._embedder.embed(prompt)
                     retrieved = await asyncio.to_thread(
-                        lambda: [t[: cfg.rag_snippet_max_chars] for t, _ in retr.query(prompt, k=k)]
+                        lambda: [t[: cfg.rag_snippet_max_chars] for t, _ in retr.query_vector(qv, k=k)]
                     )
                 except Exception:
                     retrieved = []
@@ -312,23 +428,8 @@ class PersonaCog(commands.Cog):
                 retrieved = []
             style_prompt = pdata.get("style_prompt", "")
             traits = pdata.get("traits", {})
-            # Merge in rich traits as an additional style guidance block
-            from ..llm.prompting import rich_traits_to_style
-            rich_block = rich_traits_to_style(
-                pdata.get("username", str(uid)),
-                {
-                    "text_style": pdata.get("text_style", {}),
-                    "personality": pdata.get("personality", {}),
-                    "conversation": pdata.get("conversation", {}),
-                    "topics": pdata.get("topics", {}),
-                    "media": pdata.get("media", {}),
-                },
-            )
-            combined_style = (style_prompt or "")
-            if rich_block.strip():
-                combined_style = (combined_style + "\n\n" + rich_block).strip()
-            if len(combined_style) > cfg.style_max_chars:
-                combined_style = combined_style[: cfg.style_max_chars]
+            # Style + rich traits block, precomputed on the doc by create/update
+            combined_style = cached_persona_style(pdata)
             if not style_prompt or "You are to analyze the writing style" in style_prompt or style_prompt.strip().startswith("[stubbed LLM]"):
                 # Repair older personas created while LLM was stubbed
                 style_prompt = style_from_traits(pdata.get("username", str(uid)), traits if isinstance(traits, dict) else {})
@@ -338,14 +439,7 @@ class PersonaCog(commands.Cog):
             if cfg.speak_stream:
                 # Send initial message via webhook (or fallback) and edit as tokens arrive
                 uname = str(pdata.get('username', uid))
-                avatar_url = None
-                try:
-                    if interaction.guild:
-                        mem = interaction.guild.get_member(uid) or await interaction.guild.fetch_member(uid)  # type: ignore[arg-type]
-                        if mem and getattr(mem, "display_avatar", None):
-                            avatar_url = mem.display_avatar.url  # type: ignore[attr-defined]
-                except Exception:
-                    pass
+                avatar_url = await self._resolve_avatar(interaction, pdata, uid)
                 msg = await send_via_webhook(
                     interaction.channel,  # type: ignore[arg-type]
                     "…",
@@ -353,42 +447,18 @@ class PersonaCog(commands.Cog):
                     avatar_url=avatar_url,
                 )
                 # If webhook send failed, fallback to a normal followup message we can edit
-                if msg is None:
+                if not msg:
                     msg = await interaction.followup.send("…")
-                last_edit = 0.0
-                buf = []
-                start = time.time()
-                def on_delta(s: str):
-                    nonlocal last_edit, buf
-                    buf.append(s)
-                    now = time.time()
-                    # Coalesce small chunks and edit at most every interval
-                    if (now - last_edit) * 1000.0 >= cfg.stream_edit_interval_ms and sum(len(x) for x in buf) >= cfg.stream_min_chunk_chars:
-                        content = "".join(buf)
-                        # Schedule edit in event loop
-                        try:
-                            asyncio.create_task(msg.edit(content=content))
-                            last_edit = now
-                            buf.clear()
-                        except Exception:
-                            pass
                 # Run stream in thread to avoid blocking
                 async with interaction.channel.typing():  # type: ignore
-                    draft = await asyncio.to_thread(
-                        llm.complete_stream,
+                    draft = await _stream_into(
+                        msg,
                         sprompt,
-                        on_delta,
                         time_budget_sec=float(cfg.speak_time_budget_seconds),
                         max_tokens=cfg.speak_max_tokens,
                         temperature=cfg.speak_temperature,
                         num_ctx=cfg.speak_num_ctx,
                     )
-                # Flush remaining buffer
-                try:
-                    if buf:
-                        await msg.edit(content="".join(buf))
-                except Exception:
-                    pass
             else:
                 # Typing indicator and offload
                 async with interaction.channel.typing():  # type: ignore
@@ -401,7 +471,13 @@ class PersonaCog(commands.Cog):
                     )
 
             # Anti-regurgitation
-            sim = retr.similarity_to_nearest(draft) if retr.is_ready() else 0.0
+            sim = 0.0
+            if retr.is_ready():
+                try:
+                    dv = await self._embedder.embed(draft)
+                    sim = await asyncio.to_thread(retr.similarity_to_vector, dv)
+                except Exception:
+                    sim = 0.0
             if sim > 0.92:
                 sprompt2 = sprompt + "\n\nRephrase completely in your own words and avoid phrases from snippets."
                 draft = await asyncio.to_thread(
@@ -421,14 +497,7 @@ class PersonaCog(commands.Cog):
             else:
                 # Non-streaming: send now via webhook
                 uname = str(pdata.get('username', uid))
-                avatar_url = None
-                try:
-                    if interaction.guild:
-                        mem = interaction.guild.get_member(uid) or await interaction.guild.fetch_member(uid)  # type: ignore[arg-type]
-                        if mem and getattr(mem, "display_avatar", None):
-                            avatar_url = mem.display_avatar.url  # type: ignore[attr-defined]
-                except Exception:
-                    pass
+                avatar_url = await self._resolve_avatar(interaction, pdata, uid)
                 msg2 = await send_via_webhook(
                     interaction.channel,  # type: ignore[arg-type]
                     draft,
@@ -441,30 +510,24 @@ class PersonaCog(commands.Cog):
 
     @persona.command(name="list", description="List cached personas")
     async def persona_list(self, interaction: discord.Interaction):
-        ids = pers.list_personas()
-        if not ids:
+        def _names() -> List[str]:
+            names = []
+            for uid in pers.list_personas():
+                doc = pers.read_json_cached(pers.persona_path(uid)) or {}
+                names.append(f"@{doc.get('username', uid)} ({uid})")
+            return names
+
+        names = await asyncio.to_thread(_names)
+        if not names:
             return await interaction.response.send_message("No personas cached yet.")
-        names = []
-        for uid in ids:
-            doc = pers.read_json(pers.persona_path(uid)) or {}
-            names.append(f"@{doc.get('username', uid)} ({uid})")
         await interaction.response.send_message("Personas: " + ", ".join(names))
 
     @persona.command(name="erase", description="Delete a persona and its index")
     async def persona_erase(self, interaction: discord.Interaction, user: discord.Member):
-        ok = pers.delete_persona(user.id)
-        # delete index files
-        idx = INDEX_DIR / f"{user.id}.idx"
-        npz = idx
-        faiss_file = INDEX_DIR / (f"{user.id}.idx.faiss")
-        texts_file = INDEX_DIR / (f"{user.id}.idx.texts.json")
-        meta_file = INDEX_DIR / (f"{user.id}.idx.meta.json")
-        for p in [npz, faiss_file, texts_file, meta_file]:
-            try:
-                if p.exists():
-                    p.unlink()
-            except Exception:
-                pass
+        ok = await asyncio.to_thread(pers.delete_persona, user.id)
+        # delete index files (including any sidecars)
+        await asyncio.to_thread(pers.delete_index_files, user.id)
+        self._invalidate_retriever(user.id)
         if ok:
             await interaction.response.send_message(f"Persona for @{user.display_name} erased.")
         else:
@@ -480,22 +543,38 @@ class PersonaCog(commands.Cog):
             return await interaction.followup.send("Message Content intent is disabled. Cannot read history.")
 
         # Determine window (days)
-        from datetime import datetime, timedelta, timezone
         days = int(since) if since is not None else 7
         after = datetime.now(timezone.utc) - timedelta(days=max(1, days))
 
         # Fetch new texts and images
-        texts, image_urls = await fetch_texts_and_image_urls_from_channel(channel, user, limit=600, after=after)
-        texts = clean_texts(texts)
-        if not texts and not image_urls:
+        texts, image_items = await fetch_texts_and_image_items_multi(channel, {user.id}, limit=600, after=after)
+        texts = await asyncio.to_thread(clean_texts, texts)
+        if not texts and not image_items:
             return await interaction.followup.send("No new content found for that window.")
 
         captions: List[str] = []
-        for u in image_urls[:20]:
+        # Reposted images share a URL; caption each one once
+        seen: set[str] = set()
+        items = [it for it in image_items if not (it["url"] in seen or seen.add(it["url"]))][:20]
+        # Same cache and key (attachment URL) as create/summarize; only uncached images go to the vision model
+        cached = capcache.mget(it["url"] for it in items)
+        for it in items:
+            url = it["url"]
+            if url in cached:
+                captions.append(cached[url])
+                continue
             try:
-                c = llm.vision_describe(u)
+                c = await asyncio.to_thread(
+                    llm.vision_describe, it.get("vision_url") or url,
+                    hint=(it.get("text") or None), filename=(it.get("filename") or None),
+                    strict=cfg.caption_refine,
+                )
                 if c:
                     captions.append(c)
+                    try:
+                        capcache.set(url, c)
+                    except Exception:
+                        pass
             except Exception:
                 pass
 
@@ -504,18 +583,18 @@ class PersonaCog(commands.Cog):
         retr = Retriever(index_path, embed_fn=llm.embed)
         to_add = texts[-300:] + [f"[img] {c}" for c in captions[:20]]
         if to_add:
-            retr.add_texts(to_add)
+            await asyncio.to_thread(retr.add_texts, to_add)
+            await asyncio.to_thread(retr.flush)
+            self._invalidate_retriever(user.id)
 
         # Refresh traits and style (compact)
-        traits = extract_basic_traits(texts)
-        rich_traits = extract_rich_traits(texts, media_captions=captions)
-        pdata = pers.read_json(pers.persona_path(user.id)) or {}
+        traits, rich_traits = await asyncio.to_thread(_extract_traits, texts, captions)
+        pdata = await pers.aread_json(pers.persona_path(user.id)) or {}
 
         # Rebuild style via LLM (short), fallback to rich traits summary
-        from ..llm.prompting import rich_traits_to_style
         try:
             sprompt = build_persona_creation_prompt(user.display_name, texts[-50:])
-            style_prompt = llm.complete(sprompt, max_tokens=cfg.create_max_tokens)
+            style_prompt = await asyncio.to_thread(llm.complete, sprompt, max_tokens=cfg.create_max_tokens)
         except Exception:
             style_prompt = ""
         if not style_prompt or style_prompt.strip().startswith("[stubbed LLM]"):
@@ -537,15 +616,17 @@ class PersonaCog(commands.Cog):
             "beliefs": rich_traits.get("beliefs", {}),
             "culture": rich_traits.get("culture", {}),
             "media": rich_traits.get("media", {}),
+            "avatar_url": user.display_avatar.url,
         }
-        pers.write_json(pers.persona_path(user.id), doc)
+        cache_persona_style(doc)
+        await pers.awrite_json(pers.persona_path(user.id), doc)
         await interaction.followup.send(
             f"Updated persona for @{user.display_name} with {len(texts)} new texts and {len(captions)} image captions."
         )
 
     @persona.command(name="load", description="Load persona into cache (MVP no-op)")
     async def persona_load(self, interaction: discord.Interaction, user: discord.Member):
-        if pers.read_json(pers.persona_path(user.id)):
+        if await pers.aread_json(pers.persona_path(user.id)):
             await interaction.response.send_message("Persona loaded.")
         else:
             await interaction.response.send_message("Persona not found.")
@@ -570,39 +651,53 @@ class PersonaCog(commands.Cog):
         # Scan a larger window to account for non-text messages (attachments, stickers) being skipped
         # Include both the target user's and the invoker's recent textual messages
         author_ids = {user.id, interaction.user.id}
-        messages = await fetch_recent_messages_from_channel(
-            channel,
-            user=None,
-            limit=max(50, int(last) * 10),
-            user_ids=author_ids,
-            include_non_text=False,
-        )
+        want_images = cfg.summarize_include_images and cfg.summarize_image_captions > 0
+        # Messages are cut to SUMMARIZE_MSG_MAX_CHARS below; drop the bulk at fetch time already,
+        # leaving headroom so strip/PII scrubbing still see whole tokens at the final cut
+        fetch_chars = 2 * max(40, cfg.summarize_msg_max_chars)
+        image_items: List[dict] = []
+        if want_images:
+            # Images need the wider window; collect texts from the same pass instead of a second one
+            messages, image_items = await fetch_texts_and_image_items_multi(
+                channel, author_ids, limit=max(100, int(last) * 20), max_chars=fetch_chars
+            )
+        else:
+            messages = await fetch_recent_messages_from_channel(
+                channel,
+                user=None,
+                limit=max(50, int(last) * 10),
+                user_ids=author_ids,
+                include_non_text=False,
+                max_chars=fetch_chars,
+            )
         if not messages:
             return await interaction.followup.send("No recent messages found from that user in this channel.")
-        texts = clean_texts(messages)
+        texts = await asyncio.to_thread(clean_texts, messages)
         used = texts[-last:] if last > 0 else texts
         # Truncate each message and enforce a total character budget for speed
         per_msg = max(40, cfg.summarize_msg_max_chars)
         total_cap = max(1000, cfg.summarize_total_max_chars)
         # Compress: merge consecutive very short lines to reduce overhead
+        # (parts are joined once per flush rather than re-copying a growing string)
         merged: List[str] = []
-        buf = ""
+        buf: List[str] = []
+        buf_len = -1  # length of " ".join(buf)
         for t in used:
             if len(t) < 40:
-                if buf:
-                    buf = (buf + " " + t).strip()
-                else:
-                    buf = t
-                if len(buf) >= 100:
-                    merged.append(buf)
-                    buf = ""
+                buf.append(t)
+                buf_len += len(t) + 1
+                if buf_len >= 100:
+                    merged.append(" ".join(buf))
+                    buf.clear()
+                    buf_len = -1
             else:
                 if buf:
-                    merged.append(buf)
-                    buf = ""
+                    merged.append(" ".join(buf))
+                    buf.clear()
+                    buf_len = -1
                 merged.append(t)
         if buf:
-            merged.append(buf)
+            merged.append(" ".join(buf))
         used = [s[:per_msg] for s in merged]
         if prog_msg:
             try:
@@ -611,74 +706,88 @@ class PersonaCog(commands.Cog):
                 pass
         # Optional image captions (parallel with small cache and concurrency)
         img_caps: List[str] = []
-        if cfg.summarize_include_images:
-            author_ids = {user.id, interaction.user.id}
-            items = await fetch_image_items_multi(channel, author_ids, limit=max(100, int(last) * 20))
+        if want_images:
+            items = image_items
             cap_n = max(0, cfg.summarize_image_captions)
+            # Reposted images share a URL; caption each one once
+            seen: set[str] = set()
+            items = [it for it in items if it.get("url") and not (it["url"] in seen or seen.add(it["url"]))]
             to_caption = items[:cap_n]
             # Purge old cache entries occasionally
             try:
                 capcache.purge_expired()
             except Exception:
                 pass
-            # Use cached captions when available
-            pending: List[str] = []
-            for it in to_caption:
-                url = it.get("url", "")
-                c = capcache.get(url) if url else None
-                if c:
-                    img_caps.append(c[: cfg.summarize_image_caption_max_chars])
-                else:
-                    pending.append(it)
+            # Use cached captions when available (one cache read for the whole batch)
+            cached = capcache.mget(it["url"] for it in to_caption)
+            img_caps.extend(cached[it["url"]][: cfg.summarize_image_caption_max_chars] for it in to_caption if it["url"] in cached)
+            pending = [it for it in to_caption if it["url"] not in cached]
 
             if pending:
-                import asyncio
-
-                sem = asyncio.Semaphore(max(1, cfg.summarize_caption_concurrency))
 
                 async def _cap(it: dict) -> None:
-                    async with sem:
-                        try:
-                            c = await asyncio.to_thread(
-                                llm.vision_describe, it.get("url", ""),
-                                hint=(it.get("text") or None), filename=(it.get("filename") or None)
-                            )
-                            if c and cfg.caption_refine:
-                                rp = (
-                                    "Refine this image caption to be strictly factual and grounded in any context text."
-                                    " Remove any guesses. If unsure, say 'uncertain'.\n"
-                                    f"Caption: {c}\nContext: {it.get('text','')}"
-                                )
-                                c = await asyncio.to_thread(
-                                    llm.complete,
-                                    rp,
-                                    max_tokens=cfg.caption_refine_max_tokens,
-                                    temperature=0.2,
-                                    top_p=0.5,
-                                )
-                            if c:
-                                c = c[: cfg.summarize_image_caption_max_chars]
-                                img_caps.append(c)
-                                try:
-                                    if url:
-                                        capcache.set(url, c)
-                                except Exception:
-                                    pass
-                        except Exception:
-                            return
+                    url = it["url"]
+                    try:
+                        c = await asyncio.to_thread(
+                            llm.vision_describe, it.get("vision_url") or url,
+                            hint=(it.get("text") or None), filename=(it.get("filename") or None),
+                            strict=cfg.caption_refine,
+                        )
+                        if c:
+                            # Cache the full caption (create reads it too); truncate only for this prompt
+                            img_caps.append(c[: cfg.summarize_image_caption_max_chars])
+                            try:
+                                capcache.set(url, c)
+                            except Exception:
+                                pass
+                    except Exception:
+                        return
 
-                await asyncio.gather(*(_cap(it) for it in pending))
+                # Fixed pool of caption workers pulling from the pending list
+                await sem_gather(cfg.summarize_caption_concurrency, *(_cap(it) for it in pending))
             if prog_msg:
                 try:
                     await prog_msg.edit(content=f"Summarizing @{user.display_name}: {progress_bar(40)}")
                 except Exception:
                     pass
-        # Drop oldest until within total budget
+        # Drop oldest until within total budget (one slice instead of repeated pop(0))
         total_len = sum(len(t) for t in used)
-        while used and total_len > total_cap:
-            total_len -= len(used[0])
-            used.pop(0)
+        cut = 0
+        while cut < len(used) and total_len > total_cap:
+            total_len -= len(used[cut])
+            cut += 1
+        if cut:
+            used = used[cut:]
         max_toks = min(cfg.summarize_max_tokens, 128 if cfg.summarize_fast else cfg.summarize_max_tokens)
+        chunk_toks = min(cfg.summarize_chunk_max_tokens, max_toks)
+        # Generation options shared by every summarize call, read from cfg once
+        gen_kw = {
+            "model": cfg.summarize_model_name or cfg.text_model_name,
+            "temperature": cfg.summarize_temperature,
+            "num_ctx": cfg.summarize_num_ctx,
+            "top_p": cfg.summarize_top_p,
+        }
+        invoker_note = " (+invoker)" if interaction.user.id != user.id else ""
+        header = f"Summary of @{user.display_name}{invoker_note} (requested {last}, included {len(used)} msgs):\n"
+        out_msg = None
+
+        async def _final(build_prompt) -> str:
+            # Last call produces the user-visible text; stream it into the reply when enabled
+            nonlocal out_msg
+            if cfg.summarize_stream:
+                try:
+                    prompt = await asyncio.to_thread(build_prompt)
+                    out_msg = await interaction.followup.send(header + "…", wait=True)
+                    return await _stream_into(out_msg, prompt, prefix=header, max_tokens=max_toks, **gen_kw)
+                except Exception as e:
+                    log.info("Summarize stream failed, falling back: %s", e)
+                    if out_msg is not None:
+                        try:
+                            await out_msg.delete()
+                        except Exception:
+                            pass
+                        out_msg = None
+            return await asyncio.to_thread(lambda: llm.complete(build_prompt(), max_tokens=max_toks, **gen_kw))
         # Hierarchical summarization: summarize chunks then merge
         if cfg.summarize_hierarchical and len(used) > 10:
             chunks = max(1, cfg.summarize_chunk_count)
@@ -686,35 +795,33 @@ class PersonaCog(commands.Cog):
             size = max(1, (len(used) + chunks - 1) // chunks)
             chunk_lists = [used[i : i + size] for i in range(0, len(used), size)]
 
-            chunk_summaries: List[str] = []
-            for idx, cl in enumerate(chunk_lists, start=1):
-                cp = build_summarize_prompt(user.display_name, cl, image_captions=None)
-                cs = llm.complete(
-                    cp,
-                    max_tokens=min(cfg.summarize_chunk_max_tokens, max_toks),
-                    model=cfg.summarize_model_name or cfg.text_model_name,
-                    temperature=cfg.summarize_temperature,
-                    num_ctx=cfg.summarize_num_ctx,
-                    top_p=cfg.summarize_top_p,
+            done = 0
+
+            async def _chunk(cl: List[str]) -> str:
+                nonlocal done
+                # Prompt is built in the worker thread alongside the call, not on the loop
+                cs = await asyncio.to_thread(
+                    lambda: llm.complete(
+                        build_summarize_prompt(user.display_name, cl, image_captions=None),
+                        max_tokens=chunk_toks,
+                        **gen_kw,
+                    )
                 )
-                chunk_summaries.append(cs)
+                # Advance progress as each chunk finishes, in completion order
+                done += 1
                 if prog_msg:
                     try:
-                        pct = 40 + int(idx * 50 / max(1, len(chunk_lists)))
+                        pct = 40 + int(done * 50 / max(1, len(chunk_lists)))
                         await prog_msg.edit(content=f"Summarizing @{user.display_name}: {progress_bar(pct)}")
                     except Exception:
                         pass
+                return cs
 
-            from ..llm.prompting import build_merge_summaries_prompt
+            # Chunks are independent; run them concurrently, then merge (results keep chunk order)
+            chunk_summaries = await sem_gather(cfg.summarize_llm_concurrency, *(_chunk(cl) for cl in chunk_lists))
 
-            mp = build_merge_summaries_prompt(user.display_name, chunk_summaries, image_captions=img_caps)
-            summary = llm.complete(
-                mp,
-                max_tokens=max_toks,
-                model=cfg.summarize_model_name or cfg.text_model_name,
-                temperature=cfg.summarize_temperature,
-                num_ctx=cfg.summarize_num_ctx,
-                top_p=cfg.summarize_top_p,
+            summary = await _final(
+                lambda: build_merge_summaries_prompt(user.display_name, chunk_summaries, image_captions=img_caps)
             )
             if prog_msg:
                 try:
@@ -722,24 +829,14 @@ class PersonaCog(commands.Cog):
                 except Exception:
                     pass
         else:
-            prompt = build_summarize_prompt(user.display_name, used, image_captions=img_caps)
-            summary = llm.complete(
-                prompt,
-                max_tokens=max_toks,
-                model=cfg.summarize_model_name or cfg.text_model_name,
-                temperature=cfg.summarize_temperature,
-                num_ctx=cfg.summarize_num_ctx,
-                top_p=cfg.summarize_top_p,
-            )
+            summary = await _final(lambda: build_summarize_prompt(user.display_name, used, image_captions=img_caps))
             if prog_msg:
                 try:
                     await prog_msg.edit(content=f"Summarizing @{user.display_name}: {progress_bar(100)}")
                 except Exception:
                     pass
-        invoker_note = " (+invoker)" if interaction.user.id != user.id else ""
-        await interaction.followup.send(
-            f"Summary of @{user.display_name}{invoker_note} (requested {last}, included {len(used)} msgs):\n{summary}"
-        )
+        if out_msg is None:
+            await interaction.followup.send(header + summary)
 
 
 async def setup(bot: commands.Bot):
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from ..config import cfg
+
+
+class PingCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="ping", description="Simple health check")
+    async def ping(self, interaction: discord.Interaction):
+        await interaction.response.send_message("pong")
+
+
+async def setup(bot: commands.Bot):
+    cog = PingCog(bot)
+    await bot.add_cog(cog)
+    # add_cog registers /ping globally (synced on its own when GUILD_ID is unset); also add it
+    # guild-scoped like the persona group so it is included in the guild sync
+    try:
+        if cfg.guild_id:
+            bot.tree.add_command(cog.ping, guild=discord.Object(id=int(cfg.guild_id)))
+    except Exception:
+        # If already added, ignore
+        pass
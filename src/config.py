@@ -17,7 +17,7 @@ for d in [DATA_DIR, PERSONA_DIR, INDEX_DIR]:
     d.mkdir(parents=True, exist_ok=True)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Config:
     discord_token: str = os.getenv("DISCORD_TOKEN", "")
     # Accept either GUILD_ID or DISCORD_GUILD_ID for convenience
@@ -32,14 +32,21 @@ class Config:
     # Network timeouts (seconds)
     llm_timeout: float = float(os.getenv("LLM_TIMEOUT", "60"))
     embed_timeout: float = float(os.getenv("EMBED_TIMEOUT", "30"))
+    # Proactive request pacing for the LLM backend (0 = unlimited, e.g. local Ollama)
+    llm_rpm: int = int(os.getenv("LLM_RPM", "0"))
+    llm_tpm: int = int(os.getenv("LLM_TPM", "0"))
 
     # Toggles
     use_faiss: bool = os.getenv("USE_FAISS", "true").lower() == "true"
+    # "int8" stores new persona indexes quantized (4x smaller); "none" keeps float32/FAISS
+    index_quantize: str = os.getenv("INDEX_QUANTIZE", "none").lower()
     use_mcp_context: bool = os.getenv("USE_MCP_CONTEXT", "false").lower() == "true"
 
     # Optional MCP doc sources (used only as RAG context snippets)
     mcp_context7_url: str | None = os.getenv("MCP_CONTEXT7_URL")
     mcp_discord_docs_url: str | None = os.getenv("MCP_DISCORD_DOCS_URL")
+    # Seconds a fetched docs snippet is reused before revalidating (ETag) with its source
+    mcp_cache_ttl: int = int(os.getenv("MCP_CACHE_TTL", "300"))
 
     # Generation length controls
     speak_max_tokens: int = int(os.getenv("SPEAK_MAX_TOKENS", "256"))
@@ -54,14 +61,22 @@ class Config:
     summarize_top_p: float = float(os.getenv("SUMMARIZE_TOP_P", "0.9"))
     summarize_caption_concurrency: int = int(os.getenv("SUMMARIZE_CAPTION_CONCURRENCY", "4"))
     caption_ttl_seconds: int = int(os.getenv("CAPTION_TTL_SECONDS", "86400"))
+    # Minimum seconds between caption cache purges
+    caption_purge_interval: int = int(os.getenv("CAPTION_PURGE_INTERVAL", "3600"))
     # Caption quality controls
     caption_refine: bool = os.getenv("CAPTION_REFINE", "true").lower() == "true"
     caption_refine_max_tokens: int = int(os.getenv("CAPTION_REFINE_MAX_TOKENS", "60"))
     vision_strict_captions: bool = os.getenv("VISION_STRICT_CAPTIONS", "true").lower() == "true"
+    # Longest side requested from Discord's media proxy for images sent to the captioner (0 = original)
+    vision_max_side: int = int(os.getenv("VISION_MAX_SIDE", "512"))
+    # In-process memo size for captions, keyed by image bytes
+    vision_cache_size: int = int(os.getenv("VISION_CACHE_SIZE", "4096"))
     # Hierarchical summarization
     summarize_hierarchical: bool = os.getenv("SUMMARIZE_HIERARCHICAL", "true").lower() == "true"
     summarize_chunk_count: int = int(os.getenv("SUMMARIZE_CHUNK_COUNT", "3"))
     summarize_chunk_max_tokens: int = int(os.getenv("SUMMARIZE_CHUNK_MAX_TOKENS", "96"))
+    summarize_llm_concurrency: int = int(os.getenv("SUMMARIZE_LLM_CONCURRENCY", "3"))
+    summarize_stream: bool = os.getenv("SUMMARIZE_STREAM", "true").lower() == "true"
     # Per-command model/option overrides
     summarize_model_name: str | None = os.getenv("SUMMARIZE_MODEL_NAME")
     speak_temperature: float = float(os.getenv("SPEAK_TEMPERATURE", "0.7"))
@@ -80,28 +95,49 @@ class Config:
     enable_mention_speak: bool = os.getenv("ENABLE_MENTION_SPEAK", "true").lower() == "true"
     session_max_turns: int = int(os.getenv("SESSION_MAX_TURNS", "6"))
     burst_send_delay_ms: int = int(os.getenv("BURST_SEND_DELAY_MS", "350"))
+    # Answer bare greetings/pings ("@bot hi") with a canned reply instead of the LLM
+    mention_fast_replies: bool = os.getenv("MENTION_FAST_REPLIES", "true").lower() == "true"
     # Concurrency controls for speak
     speak_global_concurrency: int = int(os.getenv("SPEAK_GLOBAL_CONCURRENCY", "2"))
     speak_channel_exclusive: bool = os.getenv("SPEAK_CHANNEL_EXCLUSIVE", "true").lower() == "true"
+    # Channel locks kept for SPEAK_CHANNEL_EXCLUSIVE (idle ones beyond this are dropped)
+    speak_chan_locks_max: int = int(os.getenv("SPEAK_CHAN_LOCKS_MAX", "1024"))
+    # Worker threads for blocking LLM/retrieval calls (bounds thread growth under bursts)
+    llm_max_workers: int = int(os.getenv("LLM_MAX_WORKERS", "4"))
 
     # RAG & prompt size controls
     rag_k: int = int(os.getenv("RAG_K", "3"))
     rag_snippet_max_chars: int = int(os.getenv("RAG_SNIPPET_MAX_CHARS", "240"))
     style_max_chars: int = int(os.getenv("STYLE_MAX_CHARS", "1000"))
+    # Reuse a persona's earlier reply for a near-identical mention (cosine >= threshold)
+    semcache_enabled: bool = os.getenv("SEMCACHE_ENABLED", "false").lower() == "true"
+    semcache_threshold: float = float(os.getenv("SEMCACHE_THRESHOLD", "0.92"))
+    semcache_ttl_seconds: int = int(os.getenv("SEMCACHE_TTL_SECONDS", "3600"))
+    semcache_max_entries: int = int(os.getenv("SEMCACHE_MAX_ENTRIES", "256"))
 
     # Optional prewarm to reduce first-token latency
     prewarm_llm: bool = os.getenv("PREWARM_LLM", "false").lower() == "true"
 
     # Create command tuning
     create_msg_fetch_limit: int = int(os.getenv("CREATE_MSG_FETCH_LIMIT", "400"))
+    # Single-author fetches via guild message search instead of scanning channel history
+    fetch_use_search: bool = os.getenv("FETCH_USE_SEARCH", "false").lower() == "true"
     create_style_msgs: int = int(os.getenv("CREATE_STYLE_MSGS", "50"))
     create_index_snippets: int = int(os.getenv("CREATE_INDEX_SNIPPETS", "180"))
     create_image_captions: int = int(os.getenv("CREATE_IMAGE_CAPTIONS", "12"))
     create_caption_concurrency: int = int(os.getenv("CREATE_CAPTION_CONCURRENCY", "4"))
     index_in_background: bool = os.getenv("INDEX_IN_BACKGROUND", "true").lower() == "true"
+    # Retriever writes its index after this many adds (callers flush() at the end of an ingest)
+    index_flush_every: int = int(os.getenv("INDEX_FLUSH_EVERY", "8"))
 
     # Embedding concurrency
     embed_concurrency: int = int(os.getenv("EMBED_CONCURRENCY", "4"))
+    # Texts per /api/embed request
+    embed_batch_size: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # Keep server embeddings on disk (data/embed_cache) keyed by text hash
+    embed_cache: bool = os.getenv("EMBED_CACHE", "true").lower() == "true"
+    # Rows kept in that cache before it is compacted to the newest half
+    embed_cache_max_rows: int = int(os.getenv("EMBED_CACHE_MAX_ROWS", "50000"))
 
     # Create interaction time budget
     create_time_budget_seconds: int = int(os.getenv("CREATE_TIME_BUDGET_SECONDS", "120"))
@@ -111,6 +147,7 @@ class Config:
     create_hierarchical: bool = os.getenv("CREATE_HIERARCHICAL", "true").lower() == "true"
     create_chunk_count: int = int(os.getenv("CREATE_CHUNK_COUNT", "3"))
     create_chunk_max_tokens: int = int(os.getenv("CREATE_CHUNK_MAX_TOKENS", "96"))
+    create_llm_concurrency: int = int(os.getenv("CREATE_LLM_CONCURRENCY", "3"))
     create_temperature: float = float(os.getenv("CREATE_TEMPERATURE", "0.5"))
     create_num_ctx: int = int(os.getenv("CREATE_NUM_CTX", "1536"))
     create_include_images: bool = os.getenv("CREATE_INCLUDE_IMAGES", "false").lower() == "true"
@@ -2,13 +2,152 @@ from __future__ import annotations
 
 from typing import List, Optional, Set, Tuple, Dict
 from datetime import datetime
+from operator import attrgetter
 
 import discord
+from discord.http import Route
+
+from ..config import cfg
 from ..utils.logging import get_logger
 
 
 log = get_logger(__name__)
 
+_IMG_EXTS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+# Fields read for every scanned message, fetched in one call
+_MSG_FIELDS = attrgetter("author", "content", "attachments")
+
+
+def _is_image(att: discord.Attachment) -> bool:
+    ct = att.content_type
+    return bool(ct and ct.startswith("image/")) or (att.filename or "").lower().endswith(_IMG_EXTS)
+
+
+def _vision_url(att: discord.Attachment) -> str:
+    """URL to caption from: a downscaled media-proxy rendition when the image is larger than
+    VISION_MAX_SIDE, so the captioner downloads and preprocesses far fewer bytes."""
+    side = cfg.vision_max_side
+    w, h = att.width or 0, att.height or 0
+    if side <= 0 or not att.proxy_url or max(w, h) <= side:
+        return att.url
+    scale = side / max(w, h)
+    sep = "&" if "?" in att.proxy_url else "?"
+    return f"{att.proxy_url}{sep}width={max(1, round(w * scale))}&height={max(1, round(h * scale))}"
+
+
+_SEARCH_PAGE = 25  # results per guild message-search page
+
+
+async def _fetch_by_author(channel: discord.TextChannel | discord.Thread, user_id: int, limit: int) -> List[discord.Message]:
+    """
+    Newest-first messages by one author in channel via the guild message-search endpoint, so
+    other authors' messages are never downloaded. Pages are _SEARCH_PAGE results, so this takes
+    ceil(limit / _SEARCH_PAGE) requests at most. Raises on any failure so the caller can fall
+    back to history().
+    """
+    state = channel._state
+    out: List[discord.Message] = []
+    max_pages = max(1, -(-limit // _SEARCH_PAGE))
+    for page in range(max_pages):
+        route = Route("GET", "/guilds/{guild_id}/messages/search", guild_id=channel.guild.id)
+        params = {
+            "author_id": user_id,
+            "channel_id": channel.id,
+            "sort_by": "timestamp",
+            "sort_order": "desc",
+            "offset": page * _SEARCH_PAGE,
+            "limit": _SEARCH_PAGE,
+        }
+        data = await state.http.request(route, params=params)
+        if not isinstance(data, dict) or "messages" not in data:
+            # e.g. 202 "index not ready yet"
+            raise RuntimeError("search index unavailable")
+        hits = data["messages"]
+        for group in hits:
+            for raw in group:
+                if raw.get("hit", True) and int(raw.get("channel_id", 0)) == channel.id:
+                    out.append(discord.Message(state=state, channel=channel, data=raw))
+        if len(hits) < _SEARCH_PAGE or len(out) >= limit:
+            break
+    return out[:limit]
+
+
+async def _scan_history(
+    channel: discord.abc.Messageable,
+    author_ids: Set[int],
+    limit: int,
+    after: Optional[datetime] = None,
+    *,
+    want_texts: bool = True,
+    want_images: bool = False,
+    want_items: bool = False,
+    include_non_text: bool = False,
+    max_chars: Optional[int] = None,
+) -> Tuple[List[str], List[str], List[Dict[str, str]]]:
+    """
+    Single history pass collecting whatever the caller asked for from messages by author_ids:
+    texts (message content, cut to max_chars if given), images (image URLs to caption) and
+    items (url/vision_url/text/filename dicts). Returns (texts, images, items), each oldest-first.
+    """
+    texts: List[str] = []
+    images: List[str] = []
+    items: List[Dict[str, str]] = []
+    add_text, add_image, add_item = texts.append, images.append, items.append
+    want_media = want_images or want_items
+
+    def _take(m: discord.Message) -> None:
+        author, content, atts = _MSG_FIELDS(m)
+        if author is None or author.id not in author_ids:
+            return
+        if want_texts:
+            if content:
+                add_text(content[:max_chars] if max_chars else content)
+            elif include_non_text and atts:
+                names = ", ".join(att.filename for att in atts)
+                add_text(f"[attachments: {names}]" if names else "[attachments]")
+        if want_media and atts:
+            msg_text = content or ""
+            for att in atts:
+                if not _is_image(att):
+                    continue
+                if want_images:
+                    add_image(att.url)
+                if want_items:
+                    add_item({
+                        "url": att.url,
+                        "vision_url": _vision_url(att),
+                        "text": msg_text,
+                        "filename": att.filename or "",
+                    })
+
+    try:
+        if isinstance(channel, (discord.TextChannel, discord.Thread)):
+            found: Optional[List[discord.Message]] = None
+            if cfg.fetch_use_search and after is None and len(author_ids) == 1:
+                try:
+                    found = await _fetch_by_author(channel, next(iter(author_ids)), limit)
+                except Exception as e:
+                    log.info("Message search unavailable in #%s, using history: %s", getattr(channel, "name", channel.id), e)
+            if found is not None:
+                for m in found:
+                    _take(m)
+            else:
+                async for m in channel.history(limit=limit, after=after):
+                    _take(m)
+        else:
+            log.info("Channel type %s not supported for history", type(channel))
+    except discord.Forbidden:
+        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
+    except discord.HTTPException as e:
+        log.warning("HTTP error while fetching history: %s", e)
+    # history() yields newest-first unless `after` is given (then it is already oldest-first);
+    # flip in place rather than copying
+    if after is None:
+        texts.reverse()
+        images.reverse()
+        items.reverse()
+    return texts, images, items
+
 
 async def fetch_recent_messages_from_channel(
     channel: discord.abc.Messageable,
@@ -17,6 +156,7 @@ async def fetch_recent_messages_from_channel(
     user_ids: Optional[Set[int]] = None,
     include_non_text: bool = False,
     after: Optional[datetime] = None,
+    max_chars: Optional[int] = None,
 ) -> List[str]:
     """
     Fetch recent messages from a channel filtered by author.
@@ -24,34 +164,19 @@ async def fetch_recent_messages_from_channel(
     - If user_ids is provided, include messages from authors whose IDs are in that set.
     - Else, if user is provided, include only that user's messages.
     - If include_non_text is True, include simple placeholders for attachment-only messages.
+    - If max_chars is set, each message is cut to that many characters.
     Returns list oldest-first.
     """
-    messages: List[str] = []
-    try:
-        if isinstance(channel, (discord.TextChannel, discord.Thread)):
-            async for m in channel.history(limit=limit, after=after):
-                allow = False
-                if user_ids is not None:
-                    allow = m.author and (m.author.id in user_ids)
-                elif user is not None:
-                    allow = m.author and (m.author.id == user.id)
-                if not allow:
-                    continue
-                if m.content:
-                    messages.append(m.content)
-                elif include_non_text and getattr(m, "attachments", None):
-                    try:
-                        names = ", ".join(att.filename for att in m.attachments)
-                        messages.append(f"[attachments: {names}]")
-                    except Exception:
-                        messages.append("[attachments]")
-        else:
-            log.info("Channel type %s not supported for history", type(channel))
-    except discord.Forbidden:
-        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
-    except discord.HTTPException as e:
-        log.warning("HTTP error while fetching history: %s", e)
-    return list(reversed(messages))  # oldest first
+    if user_ids is not None:
+        ids = set(user_ids)
+    elif user is not None:
+        ids = {user.id}
+    else:
+        return []
+    texts, _, _ = await _scan_history(
+        channel, ids, limit, after, include_non_text=include_non_text, max_chars=max_chars
+    )
+    return texts
 
 
 async def fetch_texts_and_image_urls_from_channel(
@@ -60,29 +185,8 @@ async def fetch_texts_and_image_urls_from_channel(
     limit: int = 400,
     after: Optional[datetime] = None,
 ) -> Tuple[List[str], List[str]]:
-    texts: List[str] = []
-    images: List[str] = []
-    try:
-        if isinstance(channel, (discord.TextChannel, discord.Thread)):
-            async for m in channel.history(limit=limit, after=after):
-                if m.author.id != user.id:
-                    continue
-                if m.content:
-                    texts.append(m.content)
-                if getattr(m, "attachments", None):
-                    for att in m.attachments:
-                        try:
-                            if (att.content_type and att.content_type.startswith("image/")) or str(att.filename).lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
-                                images.append(att.url)
-                        except Exception:
-                            continue
-        else:
-            log.info("Channel type %s not supported for history", type(channel))
-    except discord.Forbidden:
-        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
-    except discord.HTTPException as e:
-        log.warning("HTTP error while fetching history: %s", e)
-    return list(reversed(texts)), list(reversed(images))
+    texts, images, _ = await _scan_history(channel, {user.id}, limit, after, want_images=True)
+    return texts, images
 
 
 async def fetch_texts_and_image_urls_multi(
@@ -91,29 +195,23 @@ async def fetch_texts_and_image_urls_multi(
     limit: int = 600,
     after: Optional[datetime] = None,
 ) -> Tuple[List[str], List[str]]:
-    texts: List[str] = []
-    images: List[str] = []
-    try:
-        if isinstance(channel, (discord.TextChannel, discord.Thread)):
-            async for m in channel.history(limit=limit, after=after):
-                if not m.author or m.author.id not in user_ids:
-                    continue
-                if m.content:
-                    texts.append(m.content)
-                if getattr(m, "attachments", None):
-                    for att in m.attachments:
-                        try:
-                            if (att.content_type and att.content_type.startswith("image/")) or str(att.filename).lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
-                                images.append(att.url)
-                        except Exception:
-                            continue
-        else:
-            log.info("Channel type %s not supported for history", type(channel))
-    except discord.Forbidden:
-        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
-    except discord.HTTPException as e:
-        log.warning("HTTP error while fetching history: %s", e)
-    return list(reversed(texts)), list(reversed(images))
+    texts, images, _ = await _scan_history(channel, set(user_ids), limit, after, want_images=True)
+    return texts, images
+
+
+async def fetch_texts_and_image_items_multi(
+    channel: discord.abc.Messageable,
+    user_ids: Set[int],
+    limit: int = 600,
+    after: Optional[datetime] = None,
+    include_non_text: bool = False,
+    max_chars: Optional[int] = None,
+) -> Tuple[List[str], List[Dict[str, str]]]:
+    """Texts and image items from one history pass, for callers that need both."""
+    texts, _, items = await _scan_history(
+        channel, set(user_ids), limit, after, want_items=True, include_non_text=include_non_text, max_chars=max_chars
+    )
+    return texts, items
 
 
 async def fetch_image_items_from_channel(
@@ -122,31 +220,8 @@ async def fetch_image_items_from_channel(
     limit: int = 400,
     after: Optional[datetime] = None,
 ) -> List[Dict[str, str]]:
-    items: List[Dict[str, str]] = []
-    try:
-        if isinstance(channel, (discord.TextChannel, discord.Thread)):
-            async for m in channel.history(limit=limit, after=after):
-                if m.author.id != user.id:
-                    continue
-                msg_text = m.content or ""
-                if getattr(m, "attachments", None):
-                    for att in m.attachments:
-                        try:
-                            if (att.content_type and att.content_type.startswith("image/")) or str(att.filename).lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
-                                items.append({
-                                    "url": att.url,
-                                    "text": msg_text,
-                                    "filename": att.filename or "",
-                                })
-                        except Exception:
-                            continue
-        else:
-            log.info("Channel type %s not supported for history", type(channel))
-    except discord.Forbidden:
-        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
-    except discord.HTTPException as e:
-        log.warning("HTTP error while fetching history: %s", e)
-    return list(reversed(items))
+    _, _, items = await _scan_history(channel, {user.id}, limit, after, want_texts=False, want_items=True)
+    return items
 
 
 async def fetch_image_items_multi(
@@ -155,28 +230,5 @@ async def fetch_image_items_multi(
     limit: int = 600,
     after: Optional[datetime] = None,
 ) -> List[Dict[str, str]]:
-    items: List[Dict[str, str]] = []
-    try:
-        if isinstance(channel, (discord.TextChannel, discord.Thread)):
-            async for m in channel.history(limit=limit, after=after):
-                if not m.author or m.author.id not in user_ids:
-                    continue
-                msg_text = m.content or ""
-                if getattr(m, "attachments", None):
-                    for att in m.attachments:
-                        try:
-                            if (att.content_type and att.content_type.startswith("image/")) or str(att.filename).lower().endswith((".jpg", ".jpeg", ".png", ".gif", ".webp")):
-                                items.append({
-                                    "url": att.url,
-                                    "text": msg_text,
-                                    "filename": att.filename or "",
-                                })
-                        except Exception:
-                            continue
-        else:
-            log.info("Channel type %s not supported for history", type(channel))
-    except discord.Forbidden:
-        log.warning("Missing permissions to read history in #%s", getattr(channel, "name", channel.id))
-    except discord.HTTPException as e:
-        log.warning("HTTP error while fetching history: %s", e)
-    return list(reversed(items))
+    _, _, items = await _scan_history(channel, set(user_ids), limit, after, want_texts=False, want_items=True)
+    return items
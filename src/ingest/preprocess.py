@@ -1,7 +1,10 @@
 from __future__ import annotations
 
 import re
-from typing import List, Dict, Any, Optional
+from collections import Counter
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+
+import numpy as np
 
 
 PII_PATTERNS = [
@@ -10,21 +13,27 @@ PII_PATTERNS = [
 ]
 
 
+# All PII patterns as one alternation: a single pass over the text instead of one per pattern
+_PII_RE = re.compile("|".join(f"(?:{p.pattern})" for p in PII_PATTERNS))
+# Joins messages for batch scrubbing; a non-word char, so \b still sees message edges
+_BATCH_SEP = "\x00"
+
+
 def scrub_pii(text: str) -> str:
-    out = text
-    for pat in PII_PATTERNS:
-        out = pat.sub("[REDACTED]", out)
-    return out
+    return _PII_RE.sub("[REDACTED]", text)
+
+
+def scrub_pii_batch(texts: List[str]) -> List[str]:
+    """scrub_pii over many texts with one regex call on the joined batch."""
+    joined = _BATCH_SEP.join(texts)
+    if joined.count(_BATCH_SEP) != max(0, len(texts) - 1):
+        # A text contains the separator itself; splitting back would misalign
+        return [scrub_pii(t) for t in texts]
+    return scrub_pii(joined).split(_BATCH_SEP) if texts else []
 
 
 def clean_texts(texts: List[str]) -> List[str]:
-    cleaned = []
-    for t in texts:
-        t = t.strip()
-        t = scrub_pii(t)
-        if t:
-            cleaned.append(t)
-    return cleaned
+    return [t for t in scrub_pii_batch([t.strip() for t in texts]) if t]
 
 
 def extract_basic_traits(texts: List[str]) -> dict:
@@ -39,7 +48,7 @@ def extract_basic_traits(texts: List[str]) -> dict:
         }
     total_len = sum(len(t) for t in texts)
     avg_len = total_len / max(1, len(texts))
-    emoji_count = sum(sum(1 for ch in t if ch in "😀😃😄😁😆😅😂🙂😉😊😍😘🤔🙃😭🤣✨🔥💯👍🙏❤️") for t in texts)
+    emoji_count = sum(len(EMOJI_RE.findall(t)) for t in texts)
     emoji_rate = emoji_count / max(1, total_len)
     slang_candidates = ["lol", "brb", "idk", "btw", "omg", "ikr"]
     slang = sorted({w for t in texts for w in slang_candidates if w in t.lower()})
@@ -55,7 +64,6 @@ def extract_basic_traits(texts: List[str]) -> dict:
     }
 
 
-EMOJI_SET = set("😀😃😄😁😆😅😂🙂😉😊😍😘🤔🙃😭🤣✨🔥💯👍🙏❤️💀😬😎😜😇😏🥲😤😢🤷‍♂️🤷‍♀️😮‍💨")
 SLANG_WORDS = [
     "bruh", "ngl", "lowkey", "highkey", "fr", "ong", "tbh", "idk", "ikr", "btw",
     "lol", "lmao", "rofl", "smh", "af", "jk", "imo", "imho", "yeet", "sus",
@@ -70,6 +78,7 @@ REGIONAL = {
     "UK": ["mate", "cheers", "bloody"],
     "AU/NZ": ["mate", "heaps", "keen"],
 }
+SUBCULTURE_WORDS = ["anime", "clan", "guild", "discord"]
 TOPIC_LEXICON: Dict[str, List[str]] = {
     "media": ["anime", "manga", "movie", "show", "season", "episode", "game", "gaming", "lofi", "music", "song", "meme", "memes"],
     "lifestyle": ["gym", "workout", "travel", "trip", "food", "snack", "coffee", "tea", "run", "hike", "bike"],
@@ -78,6 +87,135 @@ TOPIC_LEXICON: Dict[str, List[str]] = {
     "events": ["news", "politics", "election", "war", "update", "launch", "release"],
 }
 
+# Compiled once at import; the trait scans below run these per message
+SENTENCE_RE = re.compile(r"[.!?]+")
+ELONGATED_RE = re.compile(r"([a-zA-Z])\1{2,}")
+GREETING_RE = re.compile(r"^(yo|hey|hi|sup|hello)\b", re.I)
+ADVICE_RE = re.compile(r"\b(you should|try|consider)\b", re.I)
+VENT_RE = re.compile(r"\b(i'?m|i am) (tired|annoyed|done)\b", re.I)
+CAPTION_TOKEN_RE = re.compile(r"[a-zA-Z]{3,}")
+try:
+    # Unicode emoji properties cover every emoji, not a hand-picked list; one C call per message
+    import regex as _regex  # type: ignore
+
+    EMOJI_RE = _regex.compile(r"\p{Emoji_Presentation}|\p{Extended_Pictographic}")
+except Exception:
+    # stdlib re has no \p{...}; approximate Extended_Pictographic with its codepoint blocks
+    EMOJI_RE = re.compile(
+        "[\u00a9\u00ae\u203c\u2049\u2122\u2139\u2194-\u2199\u21a9\u21aa\u231a-\u23ff"
+        "\u24c2\u2600-\u27bf\u2934\u2935\u2b05-\u2b07\u2b1b\u2b1c\u2b50\u2b55"
+        "\u3030\u303d\u3297\u3299\U0001f000-\U0001faff]"
+    )
+TOPIC_RES: Dict[str, List[Tuple[str, "re.Pattern[str]"]]] = {
+    cat: [(w, re.compile(rf"\b{re.escape(w)}\b", re.I)) for w in vocab]
+    for cat, vocab in TOPIC_LEXICON.items()
+}
+
+# Every substring-matched keyword, so each message is searched once rather than once per list
+KEYWORDS: Tuple[str, ...] = tuple(dict.fromkeys(
+    POS_WORDS + NEG_WORDS + HEDGES + POLITENESS + SLANG_WORDS + SUBCULTURE_WORDS
+    + [w for words in REGIONAL.values() for w in words]
+))
+
+try:
+    import ahocorasick  # type: ignore
+
+    _KW_AUTOMATON = ahocorasick.Automaton()
+    for _w in KEYWORDS:
+        _KW_AUTOMATON.add_word(_w, _w)
+    _KW_AUTOMATON.make_automaton()
+except Exception:
+    # pyahocorasick is optional; fall back to per-keyword str.count
+    _KW_AUTOMATON = None
+
+
+def _keyword_hits(lows: List[str]) -> Tuple[Counter, Counter]:
+    """
+    Scan lowercased messages for KEYWORDS (substring match, as the trait heuristics expect).
+    Returns (occurrences, messages): total hits per keyword, and how many messages contain it.
+    """
+    occ: Counter = Counter()
+    msgs: Counter = Counter()
+    if _KW_AUTOMATON is not None:
+        for low in lows:
+            hits: Counter = Counter()
+            # iter() reports overlapping matches; str.count does not, so drop a hit that starts
+            # inside the previous hit of the same word ("yayay" is one "yay", as in the fallback)
+            last_end: Dict[str, int] = {}
+            for end, w in _KW_AUTOMATON.iter(low):
+                if end - len(w) < last_end.get(w, -1):
+                    continue
+                last_end[w] = end
+                hits[w] += 1
+            occ.update(hits)
+            msgs.update(hits.keys())
+        return occ, msgs
+    for low in lows:
+        for w in KEYWORDS:
+            k = low.count(w)
+            if k:
+                occ[w] += k
+                msgs[w] += 1
+    return occ, msgs
+
+
+def extract_media_keywords(media_captions: List[str]) -> List[str]:
+    # Top caption tokens as rough media tags; only scans captions, not message texts
+    if not media_captions:
+        return []
+    tokens = []
+    for c in media_captions:
+        tokens += [w.lower() for w in CAPTION_TOKEN_RE.findall(c)]
+    stop = {"the", "and", "with", "this", "that", "have", "from", "over", "under", "your", "into", "about"}
+    tokens = [w for w in tokens if w not in stop]
+    cnt = Counter(tokens)
+    return [w for w, _ in cnt.most_common(8)]
+
+
+class _MsgScan(NamedTuple):
+    # Numeric fields first: extract_rich_traits packs sc[:_SCAN_NUMERIC] into column arrays
+    n: int
+    words: int
+    upper_words: int
+    is_lower: bool
+    excl: int
+    quest: int
+    triple: bool
+    n_emoji: int
+    emoji_end: bool
+    elongated: bool
+    greeting: bool
+    mention: bool
+    emojis: List[str]
+    lower: str
+
+
+_SCAN_NUMERIC = 12
+
+
+def _scan(t: str) -> _MsgScan:
+    # Every per-message statistic extract_rich_traits needs, from one visit of the text;
+    # all character-level work runs in C (str methods and compiled patterns)
+    lower = t.lower()
+    ws = t.split()
+    emojis = EMOJI_RE.findall(t)
+    return _MsgScan(
+        n=len(t),
+        words=len(ws),
+        upper_words=sum(1 for w in ws if len(w) > 1 and w.isupper()),
+        is_lower=bool(t) and t == lower,
+        excl=t.count("!"),
+        quest=t.count("?"),
+        triple="!!" in t or "??" in t or "..." in t,
+        n_emoji=len(emojis),
+        emoji_end=EMOJI_RE.search(t, max(0, len(t) - 3)) is not None,
+        elongated=ELONGATED_RE.search(t) is not None,
+        greeting=GREETING_RE.match(t.strip()) is not None,
+        mention="@" in t,
+        emojis=emojis,
+        lower=lower,
+    )
+
 
 def extract_rich_traits(texts: List[str], media_captions: Optional[List[str]] = None) -> Dict[str, Any]:
     if not texts:
@@ -90,113 +228,107 @@ def extract_rich_traits(texts: List[str], media_captions: Optional[List[str]] =
             "culture": {},
         }
 
-    total_chars = sum(len(t) for t in texts)
-    total_words = sum(len(t.split()) for t in texts)
-    avg_len = total_chars / max(1, len(texts))
-    avg_words = total_words / max(1, len(texts))
+    scans = [_scan(t) for t in texts]
+    n_msgs = len(scans)
+    lows = [sc.lower for sc in scans]
+    padded = [" " + low + " " for low in lows]
+    # Struct-of-arrays: one contiguous int32 column per field, so each metric below reduces
+    # only the column(s) it reads instead of striding across whole rows
+    cols = np.ascontiguousarray(
+        np.array([sc[:_SCAN_NUMERIC] for sc in scans], dtype=np.int32).reshape(n_msgs, _SCAN_NUMERIC).T
+    )
+    (lens, word_counts, upper_counts, is_lower, excl_counts, quest_counts, is_triple,
+     emoji_counts, emoji_at_end, is_elongated, is_greeting, has_mention) = cols
+
+    total_chars = int(lens.sum())
+    total_words = int(word_counts.sum())
+    avg_len = total_chars / max(1, n_msgs)
+    avg_words = total_words / max(1, n_msgs)
 
     # Sentence complexity (very rough): avg words per sentence
-    sentences = sum(max(1, len([s for s in re.split(r"[.!?]+", t) if s.strip()])) for t in texts)
+    sentences = sum(max(1, len([s for s in SENTENCE_RE.split(t) if s.strip()])) for t in texts)
     complexity = total_words / max(1, sentences)
 
     # Capitalization
-    lowercase_msgs = sum(1 for t in texts if t and t == t.lower())
-    uppercase_words = sum(1 for w in (w for t in texts for w in t.split()) if w.isupper() and len(w) > 1)
+    uppercase_words = int(upper_counts.sum())
     capitalization = (
-        "always lowercase" if lowercase_msgs / max(1, len(texts)) > 0.7 else (
+        "always lowercase" if is_lower.mean() > 0.7 else (
             "frequent ALL CAPS" if uppercase_words / max(1, total_words) > 0.05 else "mixed")
     )
 
     # Punctuation habits
-    exclam = sum(t.count("!") for t in texts)
-    quest = sum(t.count("?") for t in texts)
-    triple_punct = sum(1 for t in texts if "!!" in t or "??" in t or "..." in t)
-    punctuation = "frequent !!! and ???" if (exclam + quest) / max(1, len(texts)) > 1.0 else (
-        "uses ellipses and repeats" if triple_punct / max(1, len(texts)) > 0.3 else "normal")
+    exclam = int(excl_counts.sum())
+    quest = int(quest_counts.sum())
+    triple_rate = is_triple.mean()
+    punctuation = "frequent !!! and ???" if (exclam + quest) / max(1, n_msgs) > 1.0 else (
+        "uses ellipses and repeats" if triple_rate > 0.3 else "normal")
 
     # Emoji
-    emoji_counts = [sum(1 for ch in t if ch in EMOJI_SET) for t in texts]
-    emoji_total = sum(emoji_counts)
-    emoji_freq = emoji_total / max(1, len(texts))
-    emoji_end = sum(1 for t in texts if any(ch in EMOJI_SET for ch in t[-3:]))
-    emoji_place = "at end of sentences" if emoji_end / max(1, len(texts)) > 0.4 else "inline"
-    top_emojis = []
-    # simple top emoji extraction
-    from collections import Counter
-
-    c = Counter(ch for t in texts for ch in t if ch in EMOJI_SET)
+    c: Counter = Counter()
+    for sc in scans:
+        c.update(sc.emojis)
+    emoji_freq = emoji_counts.mean()
+    emoji_place = "at end of sentences" if emoji_at_end.mean() > 0.4 else "inline"
     top_emojis = [e for e, _ in c.most_common(5)]
 
     # Slang/acronyms
-    slang_found = sorted({w for t in texts for w in SLANG_WORDS if w in t.lower()})
+    kw_occ, kw_msgs = _keyword_hits(lows)
+    slang_found = sorted(w for w in SLANG_WORDS if kw_msgs[w])
 
     # Typos/misspellings: naive indicators
-    elongated = sum(1 for t in texts if re.search(r"([a-zA-Z])\1{2,}", t))
-    typos = "some elongated words/typos" if elongated / max(1, len(texts)) > 0.1 else "rare"
+    typos = "some elongated words/typos" if is_elongated.mean() > 0.1 else "rare"
 
     # Formatting quirks
-    code_blocks = any("```" in t or "`" in t for t in texts)
+    code_blocks = any("`" in t for t in texts)
     quotes = any(t.strip().startswith(">") for t in texts)
     formatting = ", ".join([s for s in ["code blocks" if code_blocks else "", "quote replies" if quotes else ""] if s]) or "plain"
 
     # Media usage (based on placeholders)
-    media_lines = [t for t in texts if t.startswith("[attachments:")]
-    gifs = sum(1 for t in media_lines if ".gif" in t.lower())
+    media_lines = [low for t, low in zip(texts, lows) if t.startswith("[attachments:")]
+    gifs = sum(1 for low in media_lines if ".gif" in low)
     media_usage = (
         "GIFs often" if gifs >= 3 else (
             "images sometimes" if media_lines else "rare")
     )
     media_caps = media_captions or []
-    media_keywords: List[str] = []
-    if media_caps:
-        # pick top tokens as rough tags
-        from collections import Counter
-        tokens = []
-        for c in media_caps:
-            tokens += [w.lower() for w in re.findall(r"[a-zA-Z]{3,}", c)]
-        stop = {"the", "and", "with", "this", "that", "have", "from", "over", "under", "your", "into", "about"}
-        tokens = [w for w in tokens if w not in stop]
-        cnt = Counter(tokens)
-        media_keywords = [w for w, _ in cnt.most_common(8)]
+    media_keywords = extract_media_keywords(media_caps)
 
     # Personality & tone heuristics
-    pos = sum(t.lower().count(w) for t in texts for w in POS_WORDS)
-    neg = sum(t.lower().count(w) for t in texts for w in NEG_WORDS)
+    pos = sum(kw_occ[w] for w in POS_WORDS)
+    neg = sum(kw_occ[w] for w in NEG_WORDS)
     optimism = "optimistic" if pos > neg * 1.2 else ("pessimistic" if neg > pos * 1.2 else "neutral")
-    hedge_rate = sum(1 for t in texts for w in HEDGES if w in t.lower()) / max(1, len(texts))
+    hedge_rate = sum(kw_msgs[w] for w in HEDGES) / max(1, n_msgs)
     directness = "direct" if hedge_rate < 0.1 else "hedged"
-    politeness_hits = sum(1 for t in texts for w in POLITENESS if w in t.lower())
+    politeness_hits = sum(kw_msgs[w] for w in POLITENESS)
     politeness = "polite" if politeness_hits > 0 else "informal"
-    expressiveness = "expressive" if emoji_freq > 0.5 or exclam / max(1, len(texts)) > 0.5 else "reserved"
-    humor = "meme-heavy" if any(x in (" "+t.lower()+" ") for t in texts for x in [" lol ", " lmao ", " meme "]) else "subtle"
-    exaggeration = "frequent" if triple_punct / max(1, len(texts)) > 0.3 or uppercase_words / max(1, total_words) > 0.05 else "rare"
+    expressiveness = "expressive" if emoji_freq > 0.5 or exclam / max(1, n_msgs) > 0.5 else "reserved"
+    humor = "meme-heavy" if any(x in pad for pad in padded for x in [" lol ", " lmao ", " meme "]) else "subtle"
+    exaggeration = "frequent" if triple_rate > 0.3 or uppercase_words / max(1, total_words) > 0.05 else "rare"
 
     # Conversational habits
-    short_msgs = sum(1 for t in texts if len(t) < 40)
-    bursts = "often sends short bursts" if short_msgs / max(1, len(texts)) > 0.6 else "balanced"
-    greetings = sum(1 for t in texts if re.match(r"^(yo|hey|hi|sup|hello)\b", t.strip(), re.I))
-    initiation = "often starts casually" if greetings / max(1, len(texts)) > 0.2 else "varied"
-    question_rate = sum(1 for t in texts if "?" in t) / max(1, len(texts))
-    mentions = sum(1 for t in texts if "@" in t or "<@" in t)
-    reply_style = "quotes" if quotes else ("short quips" if short_msgs / max(1, len(texts)) > 0.6 else "mixed")
-    advice_vs_vent = "advice-giving" if sum(1 for t in texts if re.search(r"\b(you should|try|consider)\b", t, re.I)) > 2 else (
-        "venting" if sum(1 for t in texts if re.search(r"\b(i'?m|i am) (tired|annoyed|done)\b", t, re.I)) > 2 else "mixed")
+    short_rate = (lens < 40).mean()
+    bursts = "often sends short bursts" if short_rate > 0.6 else "balanced"
+    initiation = "often starts casually" if is_greeting.mean() > 0.2 else "varied"
+    question_rate = float((quest_counts > 0).mean())
+    reply_style = "quotes" if quotes else ("short quips" if short_rate > 0.6 else "mixed")
+    advice_vs_vent = "advice-giving" if sum(1 for t in texts if ADVICE_RE.search(t)) > 2 else (
+        "venting" if sum(1 for t in texts if VENT_RE.search(t)) > 2 else "mixed")
 
     # Topics
     topics: Dict[str, List[str]] = {}
-    for cat, vocab in TOPIC_LEXICON.items():
-        found = sorted({w for t in texts for w in vocab if re.search(rf"\b{re.escape(w)}\b", t, re.I)})
+    for cat, vocab in TOPIC_RES.items():
+        found = sorted({w for w, pat in vocab if any(pat.search(t) for t in texts)})
         if found:
             topics[cat] = found[:10]
 
     # Cultural context
-    generation = "Gen Z" if any(s in (" "+t.lower()+" ") for t in texts for s in [" bruh ", " ngl ", " lowkey ", " fr "]) else "Millennial"
+    generation = "Gen Z" if any(s in pad for pad in padded for s in [" bruh ", " ngl ", " lowkey ", " fr "]) else "Millennial"
     regional_refs = []
     for region, words in REGIONAL.items():
-        if any(w in t.lower() for t in texts for w in words):
+        if any(kw_msgs[w] for w in words):
             regional_refs.append(region)
     subcultures = []
-    if any(w in t.lower() for t in texts for w in ["anime", "clan", "guild", "discord"]):
+    if any(kw_msgs[w] for w in SUBCULTURE_WORDS):
         subcultures.append("Discord/anime/gaming culture")
 
     return {
@@ -224,7 +356,7 @@ def extract_rich_traits(texts: List[str], media_captions: Optional[List[str]] =
             "message_bursts": bursts,
             "initiation": initiation,
             "question_frequency": f"{question_rate:.0%} of messages",
-            "mentions": "frequent" if mentions / max(1, len(texts)) > 0.3 else "occasional",
+            "mentions": "frequent" if has_mention.mean() > 0.3 else "occasional",
             "reply_style": reply_style,
             "advice_vs_venting": advice_vs_vent,
         },
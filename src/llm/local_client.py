@@ -1,22 +1,64 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Callable, Optional
 import base64
 
 import requests
 
 from ..config import cfg
+from ..utils.embed_cache import EmbedCache, text_key
+from ..utils.http import make_session
 from ..utils.logging import get_logger
+from ..utils.lru import LRUCache
+from .throttle import estimate_tokens, note_rate_limit, throttle
 import numpy as np
 
 
 log = get_logger(__name__)
 
+try:
+    import orjson  # type: ignore
+
+    _json_loads = orjson.loads
+except Exception:
+    _json_loads = json.loads  # also accepts bytes
+
+
+_FALLBACK_ROWS = 1024
+_FALLBACK_DIM = 384
+_fallback_table: Optional[np.ndarray] = None
+
+
+def _fallback_vectors(texts: List[str]) -> np.ndarray:
+    """Deterministic pseudo-embeddings for when the server is down: each text picks two rows of
+    one fixed Gaussian table by a stable digest, so the whole batch is a single gather."""
+    global _fallback_table
+    if _fallback_table is None:
+        _fallback_table = np.random.default_rng(0).standard_normal(
+            (_FALLBACK_ROWS, _FALLBACK_DIM), dtype=np.float32
+        ) / np.float32(np.sqrt(2.0))
+    digests = b"".join(hashlib.blake2s(t.encode("utf-8"), digest_size=8).digest() for t in texts)
+    idx = np.frombuffer(digests, dtype=np.uint32).reshape(len(texts), 2) % _FALLBACK_ROWS
+    # Sum of two N(0, 1/2) rows is N(0, 1); same text -> same vector, even across restarts
+    return _fallback_table[idx[:, 0]] + _fallback_table[idx[:, 1]]
+
 
 class LocalLLMClient:
     def __init__(self, base_url: str | None = None):
         self.base_url = base_url or cfg.llm_base_url
+        # One keep-alive pool shared by every worker thread instead of a connection per call
+        self._session = make_session(2 * max(cfg.embed_concurrency, cfg.llm_max_workers))
+        # None until the first embed call tells us whether the server has batched /api/embed
+        self._batch_embed: Optional[bool] = None
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._vision_cache: LRUCache[str] = LRUCache(cfg.vision_cache_size)
+        self._embed_cache = EmbedCache(cfg.embed_model_name, max_rows=cfg.embed_cache_max_rows) if cfg.embed_cache else None
 
     def complete(self, prompt: str, **kw) -> str:
         # Ollama-compatible non-streaming generate call
@@ -55,12 +97,14 @@ class LocalLLMClient:
             payload["options"] = options
         # Any remaining kwargs are ignored to avoid API incompatibility
         try:
-            resp = requests.post(url, json=payload, timeout=cfg.llm_timeout)
+            throttle.acquire(estimate_tokens(prompt) + int(options.get("num_predict", 0)))
+            resp = self._session.post(url, json=payload, timeout=cfg.llm_timeout)
             resp.raise_for_status()
             data = resp.json()
             # expected structure depends on your local server; try common fields
             return data.get("response") or data.get("text") or data.get("output") or ""
         except Exception as e:
+            note_rate_limit(e)
             log.warning("LLM unavailable, using fallback stub: %s", e)
             # Fallback: generate a concise, purpose-specific stub response
             pl = prompt.lower()
@@ -83,7 +127,7 @@ class LocalLLMClient:
                     "- Response style: direct, helpful, playful"
                 )
             # Summarize detection
-            if "summarize the last" in pl and "messages from @" in pl:
+            if "summarizing recent messages from @" in pl:
                 return "[stubbed LLM] Brief summary of recent messages: upbeat tone, common topics, and quick back-and-forth."
             # Generic
             return "[stubbed LLM] This is a stubbed response for local testing."
@@ -128,16 +172,20 @@ class LocalLLMClient:
         if options:
             payload["options"] = options
         acc = []
-        import time, json as _json
-        deadline = time.time() + float(time_budget_sec or 1e9)
+        deadline = time.monotonic() + float(time_budget_sec or 1e9)
         try:
-            with requests.post(url, json=payload, stream=True, timeout=cfg.llm_timeout) as resp:
+            throttle.acquire(estimate_tokens(prompt) + int(options.get("num_predict", 0)))
+            with self._session.post(url, json=payload, stream=True, timeout=cfg.llm_timeout) as resp:
                 resp.raise_for_status()
-                for line in resp.iter_lines(decode_unicode=True):
+                # Raw bytes frames: the JSON decoder reads UTF-8 itself, no str decode per line
+                for line in resp.iter_lines():
                     if not line:
                         continue
+                    if b'"done":true' in line:
+                        # Ollama's final frame carries stats, not text
+                        break
                     try:
-                        data = _json.loads(line)
+                        data = _json_loads(line)
                     except Exception:
                         continue
                     if isinstance(data, dict):
@@ -150,9 +198,10 @@ class LocalLLMClient:
                                 on_delta(chunk)
                             except Exception:
                                 pass
-                    if time.time() > deadline:
+                    if time.monotonic() > deadline:
                         break
         except Exception as e:
+            note_rate_limit(e)
             log.warning("LLM stream unavailable, falling back to complete: %s", e)
             text = self.complete(prompt, **kw)
             try:
@@ -162,52 +211,140 @@ class LocalLLMClient:
             return text
         return "".join(acc)
 
-    def embed(self, texts: List[str]) -> np.ndarray:
-        # Ollama embeddings API typically returns one embedding per call.
-        # Parallelize requests with bounded concurrency to reduce wall time.
-        url = f"{self.base_url}/api/embeddings"
+    def embed(self, texts: List[str], store: bool = True) -> np.ndarray:
+        # Texts embedded before (this run or a previous one) come from the on-disk cache;
+        # only the rest go to the server. store=False reads the cache without adding to it.
+        cache = self._embed_cache
+        if cache is None or not texts:
+            return self._embed_uncached(texts)
+        keys = [text_key(t) for t in texts]
+        cached = cache.get_many(keys)
+        miss = [i for i, v in enumerate(cached) if v is None]
+        if not miss:
+            return np.stack(cached)  # type: ignore[arg-type]
         try:
-            import concurrent.futures as _fut
-
-            def _one(idx_text: tuple[int, str]) -> tuple[int, np.ndarray]:
-                i, t = idx_text
-                payload = {"model": cfg.embed_model_name, "input": t}
-                r = requests.post(url, json=payload, timeout=cfg.embed_timeout)
-                r.raise_for_status()
-                d = r.json()
-                if "embedding" in d:
-                    vec = np.array(d["embedding"], dtype=np.float32)
-                elif "data" in d and isinstance(d["data"], list) and d["data"]:
-                    vec = np.array(d["data"][0].get("embedding", []), dtype=np.float32)
-                else:
-                    raise ValueError("No embedding in response")
-                if vec.size == 0:
-                    raise ValueError("Empty embedding vector")
-                return i, vec
-
-            out_ordered: List[tuple[int, np.ndarray]] = []
-            with _fut.ThreadPoolExecutor(max_workers=max(1, cfg.embed_concurrency)) as ex:
-                for res in ex.map(_one, list(enumerate(texts))):
-                    out_ordered.append(res)
-            out_ordered.sort(key=lambda x: x[0])
-            embs = [vec for _, vec in out_ordered]
-            return np.vstack(embs)
+            fresh = self._embed_remote([texts[i] for i in miss])
         except Exception as e:
+            note_rate_limit(e)
             log.warning("Embeddings unavailable, using random fallback: %s", e)
-            # Deterministic-ish random for MVP: hash text -> seed
-            arrs = []
-            for t in texts:
-                seed = abs(hash(t)) % (2**32)
-                rng = np.random.default_rng(seed)
-                arrs.append(rng.normal(size=384).astype(np.float32))
-            return np.vstack(arrs)
-
-    def vision_describe(self, image_url: str, *, hint: str | None = None, filename: str | None = None) -> str:
+            return _fallback_vectors(texts)
+        if store:
+            cache.put_many([keys[i] for i in miss], fresh)
+        if len(miss) == len(texts):
+            return fresh
+        if any(v is not None and v.shape[0] != fresh.shape[1] for v in cached):
+            # Model output size changed under the same name: cached rows are from another model
+            return self._embed_uncached(texts)
+        out = np.empty((len(texts), fresh.shape[1]), dtype=np.float32)
+        out[miss] = fresh
+        for i, v in enumerate(cached):
+            if v is not None:
+                out[i] = v
+        return out
+
+    def embed_query(self, texts: List[str]) -> np.ndarray:
+        """embed() for one-off chat queries: served from the cache, never added to it."""
+        return self.embed(texts, store=False)
+
+    def _embed_uncached(self, texts: List[str]) -> np.ndarray:
+        try:
+            return self._embed_remote(texts)
+        except Exception as e:
+            note_rate_limit(e)
+            log.warning("Embeddings unavailable, using random fallback: %s", e)
+            return _fallback_vectors(texts)
+
+    def _embed_remote(self, texts: List[str]) -> np.ndarray:
+        # Batched /api/embed (one request per EMBED_BATCH_SIZE texts); servers without it get the
+        # legacy one-text-per-call /api/embeddings. Requests run with bounded concurrency.
+        if self._batch_embed is not False:
+            try:
+                return self._embed_batched(texts)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code not in (404, 405):
+                    raise
+                log.info("Server has no /api/embed, using per-text /api/embeddings")
+                self._batch_embed = False
+        return self._embed_each(texts)
+
+    def _embed_pool(self) -> ThreadPoolExecutor:
+        # Long-lived workers: embed calls used to spin up and tear down a pool each time
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=max(1, cfg.embed_concurrency), thread_name_prefix="embed"
+                    )
+        return self._pool
+
+    def _embed_batched(self, texts: List[str]) -> np.ndarray:
+        url = f"{self.base_url}/api/embed"
+        size = max(1, cfg.embed_batch_size)
+        batches = [texts[i:i + size] for i in range(0, len(texts), size)]
+
+        def _batch(batch: List[str]) -> np.ndarray:
+            payload = {"model": cfg.embed_model_name, "input": batch}
+            throttle.acquire(sum(estimate_tokens(t) for t in batch))
+            r = self._session.post(url, json=payload, timeout=cfg.embed_timeout)
+            r.raise_for_status()
+            embs = r.json().get("embeddings")
+            if not isinstance(embs, list) or len(embs) != len(batch):
+                raise ValueError("No embeddings in response")
+            vecs = np.asarray(embs, dtype=np.float32)
+            if vecs.ndim != 2 or vecs.shape[1] == 0:
+                raise ValueError("Empty embedding vector")
+            self._batch_embed = True
+            return vecs
+
+        if len(batches) == 1:
+            return _batch(batches[0])
+        # map() yields in submission order; each batch is written straight into its rows
+        out: Optional[np.ndarray] = None
+        for start, vecs in zip(range(0, len(texts), size), self._embed_pool().map(_batch, batches)):
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[start:start + len(vecs)] = vecs
+        return out  # type: ignore[return-value]
+
+    def _embed_each(self, texts: List[str]) -> np.ndarray:
+        url = f"{self.base_url}/api/embeddings"
+
+        def _one(t: str) -> np.ndarray:
+            payload = {"model": cfg.embed_model_name, "input": t}
+            throttle.acquire(estimate_tokens(t))
+            r = self._session.post(url, json=payload, timeout=cfg.embed_timeout)
+            r.raise_for_status()
+            d = r.json()
+            if "embedding" in d:
+                vec = np.array(d["embedding"], dtype=np.float32)
+            elif "data" in d and isinstance(d["data"], list) and d["data"]:
+                vec = np.array(d["data"][0].get("embedding", []), dtype=np.float32)
+            else:
+                raise ValueError("No embedding in response")
+            if vec.size == 0:
+                raise ValueError("Empty embedding vector")
+            return vec
+
+        return np.vstack(list(self._embed_pool().map(_one, texts)))
+
+    def vision_describe(
+        self, image_url: str, *, hint: str | None = None, filename: str | None = None, strict: bool = False
+    ) -> str:
+        """Caption an image. strict=True folds the old refine pass (factual, context-grounded,
+        no guesses) into the same vision request instead of a second text-model call.
+        """
         # Preferred path: Ollama multimodal generate (e.g., moondream) on the same server
         try:
             # Download image and base64 encode
-            img_resp = requests.get(image_url, timeout=cfg.embed_timeout)
+            img_resp = self._session.get(image_url, timeout=cfg.embed_timeout)
             img_resp.raise_for_status()
+            # Keyed by content, so the same image reposted under a new URL skips inference
+            cache_key = (
+                hashlib.sha256(img_resp.content).digest(), cfg.vision_model_name, hint, filename, strict
+            )
+            hit = self._vision_cache.get(cache_key)
+            if hit is not None:
+                return hit
             b64 = base64.b64encode(img_resp.content).decode("ascii")
             url = f"{cfg.vision_base_url.rstrip('/')}/api/generate"
             base_rules = (
@@ -217,6 +354,11 @@ class LocalLLMClient:
                 " Do NOT guess identities, locations, or brands that are not explicitly visible."
                 " If unsure, say 'uncertain'."
             )
+            if strict:
+                base_rules += (
+                    " Be strictly factual and consistent with the context text when given;"
+                    " leave out anything you would have to guess."
+                )
             hint_txt = f"\nContext: {hint}" if hint else ""
             fname_txt = f" (file: {filename})" if filename else ""
             prompt = f"{base_rules}{hint_txt}\nOutput one sentence caption{fname_txt}:"
@@ -226,18 +368,25 @@ class LocalLLMClient:
                 "images": [b64],
                 "stream": False,
             }
-            resp = requests.post(url, json=payload, timeout=cfg.llm_timeout)
+            if strict:
+                # Same length budget the separate refine call used to have
+                payload["options"] = {"num_predict": cfg.caption_refine_max_tokens}
+            throttle.acquire(estimate_tokens(prompt))
+            resp = self._session.post(url, json=payload, timeout=cfg.llm_timeout)
             resp.raise_for_status()
             data = resp.json()
             text = data.get("response") or data.get("text") or data.get("output") or ""
             if text:
-                return text.strip()
-        except Exception:
+                text = text.strip()
+                self._vision_cache.put(cache_key, text)
+                return text
+        except Exception as e:
+            note_rate_limit(e)
             # fallback to legacy /describe adapter if available
             try:
                 url = f"{cfg.vision_base_url.rstrip('/')}/describe"
                 payload = {"image_url": image_url, "model": cfg.vision_model_name, "hint": hint, "filename": filename}
-                resp = requests.post(url, json=payload, timeout=cfg.embed_timeout)
+                resp = self._session.post(url, json=payload, timeout=cfg.embed_timeout)
                 if resp.ok:
                     data = resp.json()
                     return (
@@ -1,29 +1,60 @@
 from __future__ import annotations
 
-from typing import List
-
-import requests
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from ..config import cfg
+from ..utils.http import make_session
 from ..utils.logging import get_logger
 
 
 log = get_logger(__name__)
+# No retries: a retried read timeout would multiply _TIMEOUT on a best-effort fetch
+_session = make_session(2, retries=0)
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mcp")
+# (connect, read) seconds: a slow docs source must not stall prompt building
+_TIMEOUT = (1.0, 3.0)
+# url -> (etag, body, fetched_at)
+_cache: Dict[str, Tuple[Optional[str], str, float]] = {}
+
+
+def _fetch_one(url: str) -> str:
+    """Docs body for url: fresh from the in-process cache, revalidated via If-None-Match once stale,
+    and served stale if the source is unreachable. Empty string when nothing is available."""
+    now = time.monotonic()
+    cached = _cache.get(url)
+    if cached is not None and now - cached[2] < cfg.mcp_cache_ttl:
+        return cached[1]
+    headers = {"If-None-Match": cached[0]} if cached is not None and cached[0] else {}
+    try:
+        r = _session.get(url, timeout=_TIMEOUT, headers=headers)
+        if r.status_code == 304 and cached is not None:
+            _cache[url] = (cached[0], cached[1], now)
+            return cached[1]
+        if r.ok:
+            body = r.text.strip()
+            _cache[url] = (r.headers.get("ETag"), body, now)
+            return body
+    except Exception as e:
+        log.info("Skipping MCP docs fetch from %s: %s", url, e)
+    return cached[1] if cached is not None else ""
+
+
+def clear_cache() -> None:
+    _cache.clear()
 
 
 def fetch_docs_snippets(max_chars: int = 1200) -> List[str]:
     if not cfg.use_mcp_context:
         return []
     urls = [u for u in [cfg.mcp_context7_url, cfg.mcp_discord_docs_url] if u]
-    snippets: List[str] = []
-    for u in urls:
-        try:
-            r = requests.get(u, timeout=5)
-            if r.ok:
-                text = r.text.strip()
-                if text:
-                    snippets.append(text[:max_chars])
-        except Exception as e:
-            log.info("Skipping MCP docs fetch from %s: %s", u, e)
-    return snippets
-
+    now = time.monotonic()
+    stale = [u for u in urls if u not in _cache or now - _cache[u][2] >= cfg.mcp_cache_ttl]
+    if len(stale) > 1:
+        # Sources are fetched side by side: one round trip of latency instead of one per source
+        bodies = list(_pool.map(_fetch_one, urls))
+    else:
+        # At most one network fetch; fresh sources come straight from _cache without a thread hop
+        bodies = [_fetch_one(u) for u in urls]
+    return [b[:max_chars] for b in bodies if b]
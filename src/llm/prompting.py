@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from typing import List, Dict, Any
 
-from .mcp_context import fetch_docs_snippets
+from .mcp_context import clear_cache as _clear_docs_cache, fetch_docs_snippets
 from ..config import cfg
 
 
 def join_mcp_snippets() -> str:
-    snips = fetch_docs_snippets()
-    if not snips:
+    # Per-URL TTL/ETag caching lives in mcp_context; this only joins what it returns
+    if not cfg.use_mcp_context:
         return ""
-    return "\n\n[MCP-Docs]\n" + "\n---\n".join(snips)
+    snips = fetch_docs_snippets()
+    return ("\n\n[MCP-Docs]\n" + "\n---\n".join(snips)) if snips else ""
+
+
+def invalidate_mcp_cache() -> None:
+    """Force the next prompt to refetch the MCP docs."""
+    _clear_docs_cache()
 
 
 def _with_base_system(text: str) -> str:
@@ -76,6 +83,34 @@ def rich_traits_to_style(username: str, rich: Dict[str, Any]) -> str:
     )
 
 
+_STYLE_TRAIT_KEYS = ("text_style", "personality", "conversation", "topics", "media")
+
+
+def combined_persona_style(pdata: Dict[str, Any]) -> str:
+    """Persona style_prompt merged with its rich-traits block, capped to STYLE_MAX_CHARS."""
+    username = pdata.get("username", str(pdata.get("user_id", "")))
+    style_prompt = pdata.get("style_prompt", "") or ""
+    rich_block = rich_traits_to_style(username, {k: pdata.get(k, {}) for k in _STYLE_TRAIT_KEYS})
+    combined = style_prompt.strip()
+    if rich_block.strip():
+        combined = (combined + "\n\n" + rich_block).strip()
+    return combined[: cfg.style_max_chars]
+
+
+def cache_persona_style(doc: Dict[str, Any]) -> None:
+    """Store the combined style on the persona doc so speak paths can skip rebuilding it.
+    Every path that changes the style inputs (create, enrichment, update) calls this."""
+    doc["combined_style_cache"] = combined_persona_style(doc)
+
+
+def cached_persona_style(pdata: Dict[str, Any]) -> str:
+    """Combined style from the doc cache; built on the fly for docs written before the cache existed."""
+    cached = pdata.get("combined_style_cache")
+    if isinstance(cached, str):
+        return cached[: cfg.style_max_chars]
+    return combined_persona_style(pdata)
+
+
 def build_persona_creation_prompt(username: str, recent_messages: List[str]) -> str:
     msg_block = "\n\n".join(recent_messages[:200])
     base = f"""
@@ -95,18 +130,33 @@ Messages (most recent last):
     return _with_base_system(base + join_mcp_snippets())
 
 
-def build_speak_prompt(username: str, style_prompt: str, query: str, retrieved: List[str]) -> str:
-    rag_block = "\n\n[Relevant snippets]\n" + "\n---\n".join(retrieved) if retrieved else ""
-    return _with_base_system(f"""
-System style for @{username}:
-{style_prompt}
+def build_speak_prefix(username: str, style_prompt: str) -> str:
+    """Constant head of the speak prompt for a persona: style plus persona instructions, nothing
+    per-call. Safe to cache per persona; it leads the prompt so the backend's prefix (KV) cache
+    can reuse it across mentions."""
+    return _with_base_system(
+        f"System style for @{username}:\n{style_prompt}\n\n"
+        f"You are writing as the AI persona of @{username}. Keep responses natural and in their style.\n"
+        "Reflect their stated values and worldview authentically, without hedging. Prioritize fidelity to their beliefs over generic helpfulness.\n"
+        "Avoid copying training snippets; paraphrase when referencing past content."
+    )
 
-You are writing as the AI persona of @{username}. Keep responses natural and in their style.
-Reflect their stated values and worldview authentically, without hedging. Prioritize fidelity to their beliefs over generic helpfulness.
-Avoid copying training snippets; paraphrase when referencing past content.
-User: {query}
-{rag_block}
-""".strip() + join_mcp_snippets())
+
+def build_speak_prompt(
+    username: str,
+    style_prompt: str,
+    query: str,
+    retrieved: List[str],
+    *,
+    prefix: str | None = None,
+    context: str = "",
+) -> str:
+    # prefix (from build_speak_prefix) replaces style_prompt when the caller has it cached.
+    # Ordered most- to least-stable: persona prefix, docs block (TTL-cached), then the per-call
+    # conversation context, query and snippets, so repeat calls share the longest prefix.
+    rag_block = "\n\n[Relevant snippets]\n" + "\n---\n".join(retrieved) if retrieved else ""
+    head = prefix if prefix is not None else build_speak_prefix(username, style_prompt)
+    return "".join((head, join_mcp_snippets(), context, f"\n\nUser: {query}", rag_block))
 
 
 def build_beliefs_inference_prompt(username: str, messages: List[str]) -> str:
@@ -119,13 +169,12 @@ def build_beliefs_inference_prompt(username: str, messages: List[str]) -> str:
     )
 
 
-def build_summarize_prompt(username: str, messages: List[str], image_captions: List[str] | None = None) -> str:
-    # Focus on WHAT was said, not tone/traits. Optionally include image captions.
-    img_block = ""
-    if image_captions:
-        img_block = "\n\n[Images]\n" + "\n".join(f"- {c}" for c in image_captions)
-    return _with_base_system(
-        f"You are summarizing the last {len(messages)} messages from @{username}.\n"
+@lru_cache(maxsize=64)
+def _summarize_head(base_system: str, username: str) -> str:
+    # Identical for every chunk and full-summary call for a user, so the backend can reuse its
+    # prompt-prefix KV cache; anything that varies (message count, messages) comes after it.
+    head = (
+        f"You are summarizing recent messages from @{username}.\n"
         "Produce a concise, content-focused summary that captures what they actually said or asked.\n"
         "Prioritize: key points, questions/requests, decisions, action items, links/references, and any concrete info shared.\n"
         "Include notable content from images if provided.\n"
@@ -134,10 +183,29 @@ def build_summarize_prompt(username: str, messages: List[str], image_captions: L
         "- Key points: 3-6 bullets\n"
         "- Questions/requests: bullets (if any)\n"
         "- Action items: bullets (if any)\n\n"
-        "Messages (most recent last):\n"
-        + "\n".join(messages)
-        + img_block
     )
+    sp = base_system.strip()
+    return f"{sp}\n\n{head}" if sp else head
+
+
+# Hard cap on messages per summarize prompt, in case a caller skips its char budget
+_MAX_SUMMARY_MSGS = 500
+
+
+def build_summarize_prompt(username: str, messages: List[str], image_captions: List[str] | None = None) -> str:
+    # Focus on WHAT was said, not tone/traits. Optionally include image captions.
+    if len(messages) > _MAX_SUMMARY_MSGS:
+        messages = messages[-_MAX_SUMMARY_MSGS:]
+    img_block = ""
+    if image_captions:
+        img_block = "\n\n[Images]\n" + "\n".join(f"- {c}" for c in image_captions)
+    # One join, so the (large) message block is copied once rather than once per "+"
+    return "".join((
+        _summarize_head(cfg.base_system_prompt or "", username),
+        f"Messages (last {len(messages)}, most recent last):\n",
+        "\n".join(messages),
+        img_block,
+    ))
 
 
 def build_merge_summaries_prompt(
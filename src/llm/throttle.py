@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from ..config import cfg
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough words -> tokens estimate; good enough for budget pacing
+    return int(len(text.split()) * 1.3) + 1
+
+
+class RateThrottle:
+    """Thread-safe requests-per-minute and tokens-per-minute budget.
+
+    acquire() blocks the calling (worker) thread until both budgets allow the request,
+    so bursts are paced before they reach the backend rather than retried after a 429.
+    A limit <= 0 disables that dimension; with both disabled only penalize() windows apply.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0):
+        self.rpm = max(0, int(rpm))
+        self.tpm = max(0, int(tpm))
+        self._req = float(self.rpm)
+        self._tok = float(self.tpm)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def _refill(self, now: float) -> None:
+        dt = now - self._updated
+        self._updated = now
+        if self.rpm:
+            self._req = min(float(self.rpm), self._req + dt * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(float(self.tpm), self._tok + dt * self.tpm / 60.0)
+
+    def acquire(self, tokens: int = 0) -> None:
+        if not self.enabled:
+            # Still honor a backend-reported rate-limit window
+            wait = self._blocked_until - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            return
+        tokens = min(max(0, tokens), self.tpm) if self.tpm else 0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = max(0.0, self._blocked_until - now)
+                if self.rpm and self._req < 1.0:
+                    wait = max(wait, (1.0 - self._req) * 60.0 / self.rpm)
+                if self.tpm and self._tok < tokens:
+                    wait = max(wait, (tokens - self._tok) * 60.0 / self.tpm)
+                if wait <= 0.0:
+                    if self.rpm:
+                        self._req -= 1.0
+                    self._tok -= tokens
+                    return
+            time.sleep(wait)
+
+    def penalize(self, seconds: float) -> None:
+        # Backend reported a rate limit; hold all callers for the advertised window
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + max(0.0, seconds))
+
+
+throttle = RateThrottle(rpm=cfg.llm_rpm, tpm=cfg.llm_tpm)
+
+
+def note_rate_limit(exc: BaseException) -> None:
+    """If exc is an HTTP 429 (requests-style .response), pause the shared throttle for Retry-After."""
+    resp = getattr(exc, "response", None)
+    if resp is None or getattr(resp, "status_code", None) != 429:
+        return
+    try:
+        wait = float(resp.headers.get("Retry-After", "1"))
+    except Exception:
+        wait = 1.0
+    throttle.penalize(wait)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from ..utils.logging import get_logger
+
+
+log = get_logger(__name__)
+
+
+class EmbedBatcher:
+    """Coalesce concurrent single-text embed requests into one batched embed_fn call.
+
+    Requests arriving within max_wait_ms of the first one (up to max_batch) share a
+    single embed_fn(texts) round trip. embed_fn is blocking and runs via `runner`.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        *,
+        max_wait_ms: float = 10.0,
+        max_batch: int = 32,
+        runner: Callable[..., Awaitable[np.ndarray]] = asyncio.to_thread,
+    ):
+        self.embed_fn = embed_fn
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._runner = runner
+        self._queue: Optional[asyncio.Queue[Tuple[str, asyncio.Future]]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Return the (unnormalized) embedding vector for one text."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._worker())
+        fut: asyncio.Future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, fut))  # type: ignore[union-attr]
+        return await fut
+
+    async def _worker(self) -> None:
+        q = self._queue
+        assert q is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await q.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(q.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [t for t, _ in batch]
+            try:
+                vecs = await self._runner(self.embed_fn, texts)
+                if len(vecs) != len(texts):
+                    raise ValueError(f"embed_fn returned {len(vecs)} vectors for {len(texts)} texts")
+                for (_, fut), vec in zip(batch, vecs):
+                    if not fut.done():
+                        fut.set_result(vec)
+            except Exception as e:
+                log.info("Batched embed failed for %d texts: %s", len(texts), e)
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import os
 from pathlib import Path
 from typing import List, Tuple
 
@@ -13,12 +14,62 @@ from ..utils.logging import get_logger
 log = get_logger(__name__)
 
 
+_SEARCH_CHUNK = 16384  # int8 rows dequantized per matmul block
+
+
+def _append_rows(buf: np.ndarray, n: int, rows: np.ndarray) -> np.ndarray:
+    """Write rows after buf[:n], growing buf geometrically so N appends cost O(N) copying."""
+    need = n + rows.shape[0]
+    if need > buf.shape[0]:
+        grown = np.empty((max(need, 2 * buf.shape[0]),) + buf.shape[1:], dtype=buf.dtype)
+        grown[:n] = buf[:n]
+        buf = grown
+    buf[n:need] = rows
+    return buf
+
+
+def _save_npy(path: str, arr: np.ndarray) -> None:
+    # Write beside and rename over: a loaded index may still be memory-mapping the old file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def _top_k(sims: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+    n = sims.shape[1]
+    k = min(k, n)
+    if k <= 0:
+        return [[] for _ in range(sims.shape[0])]
+    # Top-k by partial selection (O(N)), then order only those k
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k] if k < n else np.tile(np.arange(n), (sims.shape[0], 1))
+    results = []
+    for srow, prow in zip(sims, part):
+        idxs = prow[np.argsort(-srow[prow], kind="stable")]
+        results.append([(int(i), float(srow[i])) for i in idxs])
+    return results
+
+
 class SimpleIndex:
-    def __init__(self, dim: int, backend: str = "numpy"):
+    """Inner-product index over normalized vectors.
+
+    Backends: "faiss" (IndexFlatIP), "numpy" (float32 matrix) and "int8" (numpy, symmetric
+    per-row int8 quantization: 4x less memory, scores within ~1% of float32).
+    """
+
+    def __init__(self, dim: int, backend: str | None = None):
         self.dim = dim
+        # INDEX_QUANTIZE=int8 picks the int8 store; otherwise FAISS IndexFlatIP (BLAS/SIMD
+        # inner-product search) unless USE_FAISS=false or not installed
+        if backend is None:
+            backend = "int8" if cfg.index_quantize == "int8" else ("faiss" if cfg.use_faiss else "numpy")
         self.backend = backend
         self.texts: List[str] = []
-        self.vecs: np.ndarray = np.zeros((0, dim), dtype=np.float32)
+        # numpy/int8 storage: rows [0, _n) of capacity-doubling buffers
+        self._buf: np.ndarray = np.zeros((0, dim), dtype=np.int8 if backend == "int8" else np.float32)
+        self._scales: np.ndarray = np.zeros((0,), dtype=np.float32)
+        self._n = 0
+        self._dirty = False
         self._faiss = None
         if self.backend == "faiss":
             try:
@@ -29,32 +80,58 @@ class SimpleIndex:
                 log.warning("FAISS unavailable, falling back to numpy: %s", e)
                 self.backend = "numpy"
 
+    @property
+    def vecs(self) -> np.ndarray:
+        """Stored vectors as float32 (dequantized for the int8 backend)."""
+        if self.backend == "int8":
+            return self._buf[: self._n].astype(np.float32) * self._scales[: self._n, None]
+        return self._buf[: self._n]
+
+    @vecs.setter
+    def vecs(self, value: np.ndarray) -> None:
+        self._n = 0
+        self._buf = self._buf[:0]
+        self._scales = self._scales[:0]
+        self._append(np.asarray(value, dtype=np.float32))
+
+    def _append(self, rows: np.ndarray) -> None:
+        if self.backend == "int8":
+            scale = np.abs(rows).max(axis=1) / 127.0 if rows.size else np.zeros((rows.shape[0],), np.float32)
+            scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+            q = np.clip(np.rint(rows / scale[:, None]), -127, 127).astype(np.int8)
+            self._scales = _append_rows(self._scales, self._n, scale)
+            rows = q
+        self._buf = _append_rows(self._buf, self._n, rows)
+        self._n += rows.shape[0]
+
     def add(self, embeddings: np.ndarray, texts: List[str]):
         if self.backend == "faiss" and self._faiss is not None:
-            self._faiss.add(embeddings.astype(np.float32))
+            self._faiss.add(np.ascontiguousarray(embeddings, dtype=np.float32))
         else:
-            self.vecs = np.vstack([self.vecs, embeddings.astype(np.float32)])
+            self._append(np.asarray(embeddings, dtype=np.float32))
         self.texts.extend(texts)
+        self._dirty = True
 
     def search(self, queries: np.ndarray, k: int) -> List[List[Tuple[int, float]]]:
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
         if self.backend == "faiss" and self._faiss is not None:
-            import faiss  # type: ignore
-
-            sims, idxs = self._faiss.search(queries.astype(np.float32), k)
+            sims, idxs = self._faiss.search(queries, k)
             results = []
             for row_sims, row_idxs in zip(sims, idxs):
                 results.append([(int(i), float(s)) for i, s in zip(row_idxs, row_sims) if i != -1])
             return results
+        # cosine sim via dot if vectors are normalized
+        if self._n == 0:
+            return [[] for _ in range(queries.shape[0])]
+        if self.backend == "int8":
+            # Dequantize block by block so the float32 copy never exceeds _SEARCH_CHUNK rows
+            sims = np.empty((queries.shape[0], self._n), dtype=np.float32)
+            for s in range(0, self._n, _SEARCH_CHUNK):
+                e = min(self._n, s + _SEARCH_CHUNK)
+                sims[:, s:e] = (queries @ self._buf[s:e].T.astype(np.float32)) * self._scales[s:e]
         else:
-            # cosine sim via dot if vectors are normalized
-            if self.vecs.shape[0] == 0:
-                return [[] for _ in range(queries.shape[0])]
             sims = queries @ self.vecs.T
-            results = []
-            for srow in sims:
-                idxs = np.argsort(-srow)[:k]
-                results.append([(int(i), float(srow[i])) for i in idxs])
-            return results
+        return _top_k(sims, k)
 
     def save(self, path: Path):
         path.parent.mkdir(parents=True, exist_ok=True)
@@ -62,44 +139,74 @@ class SimpleIndex:
             import faiss  # type: ignore
 
             faiss.write_index(self._faiss, str(path) + ".faiss")
-            meta = {"backend": "faiss", "dim": self.dim, "size": len(self.texts)}
-            (path.parent / (path.name + ".meta.json")).write_text(json.dumps(meta))
-            (path.parent / (path.name + ".texts.json")).write_text(json.dumps(self.texts))
         else:
-            np.savez_compressed(str(path), vecs=self.vecs, texts=np.array(self.texts, dtype=object))
+            # Uncompressed .npy: float32 embeddings barely compress, and zlib dominated save time
+            _save_npy(str(path) + ".npy", self._buf[: self._n])
+            if self.backend == "int8":
+                _save_npy(str(path) + ".scales.npy", self._scales[: self._n])
+        (path.parent / (path.name + ".texts.json")).write_text(json.dumps(self.texts))
+        # Meta last: its presence marks a complete save
+        meta = {"backend": self.backend, "dim": self.dim, "size": len(self.texts)}
+        (path.parent / (path.name + ".meta.json")).write_text(json.dumps(meta))
+        self._dirty = False
+
+    def flush(self, path: Path) -> bool:
+        """Save only if rows were added since the last save; returns whether it wrote."""
+        if not self._dirty:
+            return False
+        self.save(path)
+        return True
 
     @classmethod
     def load(cls, path: Path) -> "SimpleIndex | None":
-        if (path.parent / (path.name + ".meta.json")).exists():
-            # FAISS backend
-            try:
-                import faiss  # type: ignore
-                meta = json.loads((path.parent / (path.name + ".meta.json")).read_text())
-                idx = cls(int(meta["dim"]), backend="faiss")
-                idx._faiss = faiss.read_index(str(path) + ".faiss")
-                idx.texts = json.loads((path.parent / (path.name + ".texts.json")).read_text())
-                return idx
-            except Exception as e:
-                log.error("Failed to load FAISS index: %s", e)
-                return None
-        else:
-            # numpy backend
-            if not path.exists():
-                return None
+        meta_path = path.parent / (path.name + ".meta.json")
+        if meta_path.exists():
             try:
-                data = np.load(str(path), allow_pickle=True)
-                vecs = data["vecs"].astype(np.float32)
-                texts = list(map(str, data["texts"].tolist()))
-                idx = cls(vecs.shape[1], backend="numpy")
-                idx.vecs = vecs
+                meta = json.loads(meta_path.read_text())
+                texts = json.loads((path.parent / (path.name + ".texts.json")).read_text())
+                if meta.get("backend", "faiss") == "faiss":
+                    import faiss  # type: ignore
+
+                    idx = cls(int(meta["dim"]), backend="faiss")
+                    idx._faiss = faiss.read_index(str(path) + ".faiss")
+                else:
+                    # Memory-mapped read-only: rows page in on demand and the page cache is
+                    # shared between processes; the first add() copies into a growable buffer
+                    idx = cls(int(meta["dim"]), backend="int8" if meta["backend"] == "int8" else "numpy")
+                    idx._buf = np.load(str(path) + ".npy", mmap_mode="r")
+                    if idx.backend == "int8":
+                        idx._scales = np.load(str(path) + ".scales.npy").astype(np.float32)
+                    idx._n = idx._buf.shape[0]
                 idx.texts = texts
                 return idx
             except Exception as e:
-                log.error("Failed to load numpy index: %s", e)
+                log.error("Failed to load index %s: %s", path, e)
                 return None
+        # Legacy numpy format; savez_compressed appended .npz to the index path
+        legacy = next((p for p in (path.parent / (path.name + ".npz"), path) if p.exists()), None)
+        if legacy is None:
+            return None
+        try:
+            data = np.load(str(legacy), allow_pickle=True)
+            vecs = data["vecs"].astype(np.float32)
+            texts = list(map(str, data["texts"].tolist()))
+            idx = cls(vecs.shape[1], backend="numpy")
+            idx.vecs = vecs
+            idx.texts = texts
+            return idx
+        except Exception as e:
+            log.error("Failed to load numpy index: %s", e)
+            return None
 
 
 def normalize(vecs: np.ndarray) -> np.ndarray:
-    norms = np.linalg.norm(vecs, axis=1, keepdims=True) + 1e-8
-    return vecs / norms
+    """L2-normalize rows. Writable float32 input is normalized in place (and returned);
+    anything else is converted to a new float32 array first."""
+    vecs = np.asarray(vecs, dtype=np.float32)
+    if not vecs.flags.writeable:
+        vecs = vecs.copy()
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    np.maximum(norms, 1e-8, out=norms)
+    np.divide(vecs, norms, out=vecs)
+    return vecs
 
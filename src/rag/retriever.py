@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import threading
 from pathlib import Path
 from typing import List, Tuple
 
 import numpy as np
 
+from ..config import cfg
 from ..utils.logging import get_logger
 from .embedder import SimpleIndex, normalize
 
@@ -17,28 +19,73 @@ class Retriever:
         self.index_path = index_path
         self.embed_fn = embed_fn
         self.index = SimpleIndex.load(index_path)
+        # Serializes index append/save so batches can be embedded concurrently
+        self._lock = threading.Lock()
+        self._adds_since_flush = 0
         if not self.index:
             log.info("No index at %s yet", index_path)
 
     def is_ready(self) -> bool:
         return self.index is not None and len(self.index.texts) > 0
 
+    def embed_batch(self, texts: List[str]) -> np.ndarray:
+        """Normalized embeddings for texts, ready for add_vectors(); does not touch the index."""
+        return normalize(self.embed_fn(texts))
+
     def add_texts(self, texts: List[str], dim_hint: int = 768):
-        vecs = normalize(self.embed_fn(texts))
-        if self.index is None:
-            backend = "faiss" if vecs.shape[1] and vecs.shape[1] > 0 else "numpy"
-            self.index = SimpleIndex(vecs.shape[1] or dim_hint, backend=backend)
-        self.index.add(vecs, texts)
-        self.index.save(self.index_path)
+        self.add_vectors(self.embed_batch(texts), texts, dim_hint=dim_hint)
+
+    def add_vectors(self, vecs: np.ndarray, texts: List[str], dim_hint: int = 768):
+        """Append pre-normalized vectors (one row per text). The index is written every
+        INDEX_FLUSH_EVERY adds; call flush() when a batch of adds is complete."""
+        if len(vecs) != len(texts):
+            raise ValueError(f"{len(vecs)} vectors for {len(texts)} texts")
+        with self._lock:
+            if self.index is None:
+                self.index = SimpleIndex(vecs.shape[1] or dim_hint)
+            self.index.add(vecs, texts)
+            self._adds_since_flush += 1
+            if self._adds_since_flush >= max(1, cfg.index_flush_every):
+                self._flush_locked()
+
+    def flush(self) -> None:
+        """Write the index to disk if anything was added since the last write."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if self.index is not None:
+            self.index.flush(self.index_path)
+        self._adds_since_flush = 0
 
     def query(self, q: str, k: int = 5) -> List[Tuple[str, float]]:
         if not self.index or not self.index.texts:
             return []
-        qv = normalize(self.embed_fn([q]))
+        return self.query_vector(self.embed_fn([q]), k=k)
+
+    def query_vector(self, qv: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
+        """Search with an already-computed query embedding (e.g. from a batched embed)."""
+        if not self.index or not self.index.texts:
+            return []
+        qv = normalize(np.array(qv, dtype=np.float32).reshape(1, -1))
         results = self.index.search(qv, k=k)[0]
         return [(self.index.texts[i], score) for i, score in results]
 
+    def query_many(self, qs: List[str], k: int = 5) -> List[List[Tuple[str, float]]]:
+        """query() for several strings with one embed_fn call and one matrix search."""
+        if not qs:
+            return []
+        if not self.index or not self.index.texts:
+            return [[] for _ in qs]
+        qvs = normalize(self.embed_fn(list(qs)))
+        texts = self.index.texts
+        return [[(texts[i], score) for i, score in row] for row in self.index.search(qvs, k=k)]
+
     def similarity_to_nearest(self, text: str) -> float:
         res = self.query(text, k=1)
         return res[0][1] if res else 0.0
 
+    def similarity_to_vector(self, qv: np.ndarray) -> float:
+        res = self.query_vector(qv, k=1)
+        return res[0][1] if res else 0.0
+
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embedder import SimpleIndex, normalize
+
+
+class SemanticResponseCache:
+    """Per-persona cache of generated replies keyed by the query embedding.
+
+    lookup() returns a stored reply when a previous query for the same persona is within
+    `threshold` cosine similarity and younger than `ttl_seconds`. Each persona keeps at most
+    `max_entries` replies; when full, the older half is dropped.
+    """
+
+    def __init__(self, threshold: float, ttl_seconds: int, max_entries: int):
+        self.threshold = float(threshold)
+        self.ttl = float(ttl_seconds)
+        self.max_entries = max(2, int(max_entries))
+        # uid -> (index over query vectors with replies as texts, store time per row)
+        self._by_uid: Dict[int, Tuple[SimpleIndex, List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, uid: int, qv: np.ndarray) -> Optional[str]:
+        q = normalize(np.array(qv, dtype=np.float32).reshape(1, -1))
+        with self._lock:
+            ent = self._by_uid.get(uid)
+            if ent is None or ent[0].dim != q.shape[1]:
+                return None
+            idx, stamps = ent
+            now = time.monotonic()
+            # A few candidates, so an expired best match doesn't hide a fresh one just below it
+            for i, score in idx.search(q, k=3)[0]:
+                if score < self.threshold:
+                    break
+                if now - stamps[i] <= self.ttl:
+                    return idx.texts[i]
+        return None
+
+    def store(self, uid: int, qv: np.ndarray, reply: str) -> None:
+        if not reply:
+            return
+        q = normalize(np.array(qv, dtype=np.float32).reshape(1, -1))
+        with self._lock:
+            ent = self._by_uid.get(uid)
+            if ent is None or ent[0].dim != q.shape[1]:
+                ent = (SimpleIndex(q.shape[1], backend="numpy"), [])
+            elif len(ent[1]) >= self.max_entries:
+                old, stamps = ent
+                keep = self.max_entries // 2
+                fresh = SimpleIndex(old.dim, backend="numpy")
+                fresh.add(old.vecs[-keep:], old.texts[-keep:])
+                ent = (fresh, stamps[-keep:])
+            ent[0].add(q, [reply])
+            ent[1].append(time.monotonic())
+            self._by_uid[uid] = ent
+
+    def invalidate(self, uid: int) -> None:
+        with self._lock:
+            self._by_uid.pop(int(uid), None)
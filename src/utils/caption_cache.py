@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import json
+import sqlite3
+import threading
 import time
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Iterable, Tuple
 
 from ..config import DATA_DIR, cfg
 from .logging import get_logger
@@ -11,58 +13,103 @@ from .logging import get_logger
 
 log = get_logger(__name__)
 
-_PATH: Path = DATA_DIR / "caption_cache.json"
+_PATH: Path = DATA_DIR / "caption_cache.db"
+_LEGACY_PATH: Path = DATA_DIR / "caption_cache.json"
 
+# url -> (caption, ts); loaded once, then kept in step with the database
+_mem: Dict[str, Tuple[str, int]] = {}
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+_last_purge = 0.0  # time.monotonic() of the last purge that ran
 
-def _load() -> Dict[str, Any]:
+
+def _db() -> Optional[sqlite3.Connection]:
+    """Open the database and fill the in-memory map on first use (caller holds _lock)."""
+    global _conn
+    if _conn is not None:
+        return _conn
     try:
-        if _PATH.exists():
-            return json.loads(_PATH.read_text())
+        _PATH.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(_PATH), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS captions (url TEXT PRIMARY KEY, caption TEXT NOT NULL, ts INTEGER NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS captions_ts ON captions (ts)")
+        _migrate_legacy(conn)
+        for url, caption, ts in conn.execute("SELECT url, caption, ts FROM captions"):
+            _mem[url] = (caption, int(ts))
+        _conn = conn
     except Exception as e:
-        log.info("caption cache load failed: %s", e)
-    return {}
+        log.info("caption cache open failed, running in memory only: %s", e)
+    return _conn
 
 
-def _save(data: Dict[str, Any]) -> None:
+def _migrate_legacy(conn: sqlite3.Connection) -> None:
+    # One-time import of the old whole-file JSON cache into a fresh database; the JSON file is
+    # left in place (it is tracked in the repo)
+    if not _LEGACY_PATH.exists():
+        return
+    if conn.execute("SELECT 1 FROM captions LIMIT 1").fetchone() is not None:
+        return
     try:
-        _PATH.parent.mkdir(parents=True, exist_ok=True)
-        _PATH.write_text(json.dumps(data))
+        data = json.loads(_LEGACY_PATH.read_text())
+        rows = [
+            (url, str(rec["caption"]), int(rec.get("ts", 0)))
+            for url, rec in data.items()
+            if isinstance(rec, dict) and rec.get("caption")
+        ]
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO captions (url, caption, ts) VALUES (?, ?, ?)", rows)
+        log.info("Migrated %d cached captions to %s", len(rows), _PATH.name)
     except Exception as e:
-        log.info("caption cache save failed: %s", e)
+        log.info("caption cache migration skipped: %s", e)
 
 
-def purge_expired(ttl_seconds: int | None = None) -> None:
+def purge_expired(ttl_seconds: int | None = None, force: bool = False) -> None:
+    """Drop captions older than the TTL; a no-op if the last purge ran within CAPTION_PURGE_INTERVAL."""
+    global _last_purge
     ttl = ttl_seconds or cfg.caption_ttl_seconds
-    now = int(time.time())
-    data = _load()
-    removed = 0
-    for k in list(data.keys()):
-        try:
-            if now - int(data[k].get("ts", 0)) > ttl:
-                data.pop(k, None)
-                removed += 1
-        except Exception:
-            data.pop(k, None)
-            removed += 1
-    if removed:
-        _save(data)
+    cutoff = int(time.time()) - ttl
+    with _lock:
+        now = time.monotonic()
+        if not force and _last_purge and now - _last_purge < cfg.caption_purge_interval:
+            return
+        _last_purge = now
+        conn = _db()
+        for url in [u for u, (_, ts) in _mem.items() if ts < cutoff]:
+            del _mem[url]
+        if conn is not None:
+            try:
+                with conn:
+                    conn.execute("DELETE FROM captions WHERE ts < ?", (cutoff,))
+            except Exception as e:
+                log.info("caption cache purge failed: %s", e)
 
 
 def get(url: str) -> Optional[str]:
-    try:
-        rec = _load().get(url)
-        if rec and isinstance(rec, dict):
-            return str(rec.get("caption")) if rec.get("caption") else None
-    except Exception:
-        return None
-    return None
+    with _lock:
+        _db()
+        rec = _mem.get(url)
+    return rec[0] if rec else None
 
 
-def set(url: str, caption: str) -> None:
-    try:
-        data = _load()
-        data[url] = {"caption": caption, "ts": int(time.time())}
-        _save(data)
-    except Exception as e:
-        log.info("caption cache set failed: %s", e)
+def mget(urls: Iterable[str]) -> Dict[str, str]:
+    """Cached captions for any of urls (missing URLs are omitted)."""
+    with _lock:
+        _db()
+        return {url: _mem[url][0] for url in urls if url in _mem}
 
+
+def set(url: str, caption: str) -> None:
+    if not caption:
+        return
+    ts = int(time.time())
+    with _lock:
+        conn = _db()
+        _mem[url] = (caption, ts)
+        if conn is not None:
+            try:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO captions (url, caption, ts) VALUES (?, ?, ?)", (url, caption, ts))
+            except Exception as e:
+                log.info("caption cache set failed: %s", e)
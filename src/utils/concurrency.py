@@ -1,36 +1,106 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Dict
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, TypeVar
 
 from ..config import cfg
 
 
 _speak_sem = asyncio.Semaphore(max(1, cfg.speak_global_concurrency))
-_chan_locks: Dict[int, asyncio.Lock] = {}
+# Per-channel locks, most recently used last; idle ones past SPEAK_CHAN_LOCKS_MAX are dropped
+_chan_locks: "OrderedDict[int, asyncio.Lock]" = OrderedDict()
+_llm_pool = ThreadPoolExecutor(max_workers=max(1, cfg.llm_max_workers), thread_name_prefix="llm")
+
+T = TypeVar("T")
+
+
+async def to_llm_thread(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Drop-in for asyncio.to_thread that runs on the bounded LLM worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_llm_pool, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_llm_pool() -> None:
+    _llm_pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def sem_gather(n: int, *aws: Awaitable[T]) -> List[T]:
+    """Like asyncio.gather, but at most n awaitables run at once.
+
+    Only n worker tasks are created; each pulls the next awaitable when it finishes one,
+    so pending work is never scheduled eagerly. Results keep input order. If one awaitable
+    raises, the other workers are cancelled and awaitables that never started are closed
+    before the exception propagates.
+    """
+    results: List[Any] = [None] * len(aws)
+    pending = iter(enumerate(aws))
+
+    async def _worker() -> None:
+        for i, aw in pending:
+            results[i] = await aw
+
+    workers = [asyncio.ensure_future(_worker()) for _ in range(min(max(1, n), len(aws)))]
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for _, aw in pending:
+            if asyncio.iscoroutine(aw):
+                aw.close()
+            elif isinstance(aw, asyncio.Future):
+                aw.cancel()
+        raise
+    return results
+
+
+def _lock_idle(lock: asyncio.Lock) -> bool:
+    return not lock.locked() and not getattr(lock, "_waiters", None)
 
 
 def channel_lock(channel_id: int) -> asyncio.Lock:
     lock = _chan_locks.get(channel_id)
-    if lock is None:
-        lock = asyncio.Lock()
-        _chan_locks[channel_id] = lock
+    if lock is not None:
+        _chan_locks.move_to_end(channel_id)
+        return lock
+    lock = asyncio.Lock()
+    _chan_locks[channel_id] = lock
+    excess = len(_chan_locks) - max(1, cfg.speak_chan_locks_max)
+    if excess > 0:
+        # Oldest first; skip held locks and ones with queued waiters (release() clears locked()
+        # before the woken waiter runs), so a channel never ends up with two live locks
+        idle = [c for c, lk in _chan_locks.items() if c != channel_id and _lock_idle(lk)][:excess]
+        for cid in idle:
+            del _chan_locks[cid]
     return lock
 
 
 class SpeakGuard:
     def __init__(self, channel_id: int | None):
-        self._chan_id = channel_id
-        self._chan_lock = channel_lock(channel_id) if (cfg.speak_channel_exclusive and channel_id is not None) else None
+        self._chan_id = channel_id if cfg.speak_channel_exclusive else None
+        self._chan_lock: asyncio.Lock | None = None
 
     async def __aenter__(self):
         await _speak_sem.acquire()
-        if self._chan_lock is not None:
-            await self._chan_lock.acquire()
+        try:
+            if self._chan_id is not None:
+                # Looked up only once admitted, so an idle lock evicted meanwhile isn't reused
+                lock = channel_lock(self._chan_id)
+                await lock.acquire()
+                self._chan_lock = lock
+        except BaseException:
+            _speak_sem.release()
+            raise
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self._chan_lock is not None and self._chan_lock.locked():
-            self._chan_lock.release()
-        _speak_sem.release()
-
+        try:
+            if self._chan_lock is not None:
+                self._chan_lock.release()
+                self._chan_lock = None
+        finally:
+            _speak_sem.release()
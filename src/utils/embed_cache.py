@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from ..config import DATA_DIR
+from .logging import get_logger
+
+
+log = get_logger(__name__)
+
+_DIR: Path = DATA_DIR / "embed_cache"
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+
+class EmbedCache:
+    """Append-only on-disk store of raw embeddings for one model, keyed by text hash.
+
+    Vectors live in a flat float32 file read through np.memmap; a sidecar lists one hex key
+    per row (first line: dimension). Rows are appended vectors-first, so a crash mid-append
+    at worst leaves an unreferenced tail that is trimmed on the next load. Past max_rows the
+    store is compacted to its newest half.
+    """
+
+    def __init__(self, model: str, root: Path = _DIR, max_rows: int = 50000):
+        tag = hashlib.sha1(model.encode("utf-8")).hexdigest()[:12]
+        self._vec_path = root / f"{tag}.f32"
+        self._key_path = root / f"{tag}.keys"
+        self._lock = threading.Lock()
+        self._rows: Dict[bytes, int] = {}
+        self._dim = 0
+        self._mm: Optional[np.memmap] = None
+        self._loaded = False
+        self.max_rows = max(2, int(max_rows))
+
+    def _reset(self) -> None:
+        # Forget everything in memory; the next use reloads (and trims) from disk
+        self._rows, self._dim, self._mm, self._loaded = {}, 0, None, False
+
+    def _load(self) -> None:
+        self._loaded = True
+        try:
+            if not self._key_path.exists() or not self._vec_path.exists():
+                return
+            lines = self._key_path.read_text().splitlines()
+            if not lines:
+                return
+            dim = int(lines[0])
+            n = min(len(lines) - 1, self._vec_path.stat().st_size // (4 * dim))
+            # Drop any half-written tail so later appends line up rows with keys again
+            if self._vec_path.stat().st_size != n * 4 * dim:
+                os.truncate(self._vec_path, n * 4 * dim)
+            if len(lines) - 1 != n:
+                self._key_path.write_text("".join(line + "\n" for line in lines[:n + 1]))
+            self._dim = dim
+            self._rows = {bytes.fromhex(k): i for i, k in enumerate(lines[1:n + 1])}
+        except Exception as e:
+            log.info("embed cache load failed, starting empty: %s", e)
+            self._rows, self._dim, self._mm = {}, 0, None
+
+    def _map(self) -> Optional[np.memmap]:
+        if self._mm is None and self._rows:
+            self._mm = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(len(self._rows), self._dim))
+        return self._mm
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Cached vector (a copy) for each key, or None where missing."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            rows = [self._rows.get(k) for k in keys]
+            if all(r is None for r in rows):
+                return [None] * len(keys)
+            mm = self._map()
+            return [None if r is None else np.array(mm[r]) for r in rows]
+
+    def put_many(self, keys: List[bytes], vecs: np.ndarray) -> None:
+        if len(keys) == 0:
+            return
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            dim = int(vecs.shape[1])
+            if self._dim and dim != self._dim:
+                log.info("embed cache dim %d != %d; not caching", dim, self._dim)
+                return
+            fresh: Dict[bytes, int] = {}
+            for i, k in enumerate(keys):
+                if k not in self._rows and k not in fresh:
+                    fresh[k] = i
+            if not fresh:
+                return
+            if len(self._rows) + len(fresh) > self.max_rows:
+                self._compact(max(0, self.max_rows // 2 - len(fresh)))
+            try:
+                self._vec_path.parent.mkdir(parents=True, exist_ok=True)
+                rows = np.ascontiguousarray(vecs[list(fresh.values())], dtype=np.float32)
+                new_file = not self._rows
+                with open(self._vec_path, "wb" if new_file else "ab") as f:
+                    f.write(rows.tobytes())
+                with open(self._key_path, "w" if new_file else "a") as f:
+                    if new_file:
+                        f.write(f"{dim}\n")
+                    f.write("".join(k.hex() + "\n" for k in fresh))
+            except Exception as e:
+                log.info("embed cache save failed: %s", e)
+                self._reset()
+                return
+            base = len(self._rows)
+            for j, k in enumerate(fresh):
+                self._rows[k] = base + j
+            self._dim = dim
+            self._mm = None  # remap to cover the appended rows
+
+    def _compact(self, keep: int) -> None:
+        """Rewrite the store with only its newest `keep` rows (caller holds _lock)."""
+        try:
+            order = sorted(self._rows, key=self._rows.__getitem__)[len(self._rows) - keep:] if keep else []
+            mm = self._map()
+            rows = np.array(mm[len(self._rows) - len(order):]) if order and mm is not None else None
+            self._mm = None
+            # Keys go first: without them the store reads as empty, so a crash part-way through
+            # can never pair old keys with the rewritten vectors
+            self._key_path.unlink(missing_ok=True)
+            if rows is None:
+                self._vec_path.unlink(missing_ok=True)
+                self._rows, self._dim = {}, 0
+                return
+            tmp = self._vec_path.with_name(self._vec_path.name + ".tmp")
+            tmp.write_bytes(rows.tobytes())
+            os.replace(tmp, self._vec_path)
+            tmp = self._key_path.with_name(self._key_path.name + ".tmp")
+            tmp.write_text(f"{self._dim}\n" + "".join(k.hex() + "\n" for k in order))
+            os.replace(tmp, self._key_path)
+            self._rows = {k: i for i, k in enumerate(order)}
+            log.info("embed cache compacted to %d rows", len(order))
+        except Exception as e:
+            log.info("embed cache compaction failed, starting empty: %s", e)
+            for p in (self._key_path, self._vec_path):
+                try:
+                    p.unlink(missing_ok=True)
+                except OSError:
+                    pass
+            self._rows, self._dim, self._mm = {}, 0, None
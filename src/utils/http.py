@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def make_session(pool_maxsize: int = 10, retries: int = 2) -> requests.Session:
+    """Session with keep-alive pools sized for pool_maxsize concurrent workers.
+
+    Only connection failures and idempotent reads are retried (urllib3 defaults), so a
+    POST that reached the server is never sent twice; 429s are left to the throttle.
+    retries=0 turns retrying off, for best-effort fetches that must fail fast.
+    """
+    s = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=max(1, pool_maxsize),
+        max_retries=Retry(total=retries, backoff_factor=0.1, raise_on_status=False),
+    )
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    return s
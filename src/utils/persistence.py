@@ -1,16 +1,41 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import os
+import threading
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from .logging import get_logger
-from ..config import PERSONA_DIR, STATE_FILE
+from ..config import INDEX_DIR, PERSONA_DIR, STATE_FILE
 
 
 log = get_logger(__name__)
 
+try:
+    import orjson  # type: ignore
+
+    _loads = orjson.loads
+
+    def _dumps(data: Dict[str, Any]) -> bytes:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Types orjson won't serialize (e.g. int subclasses); stdlib handles them
+            return json.dumps(data, indent=2).encode("utf-8")
+except Exception:
+    _loads = json.loads  # also accepts bytes
+
+    def _dumps(data: Dict[str, Any]) -> bytes:
+        return json.dumps(data, indent=2).encode("utf-8")
+
+# path -> ((st_mtime_ns, st_size), parsed document)
+_json_cache: Dict[Path, Tuple[Tuple[int, int], Dict[str, Any]]] = {}
+# (PERSONA_DIR st_mtime_ns, sorted persona ids); dropped whenever we add or remove a persona file
+_personas_cache: Optional[Tuple[int, list[int]]] = None
+
 
 def persona_path(user_id: int) -> Path:
     return PERSONA_DIR / f"{user_id}.json"
@@ -20,32 +45,119 @@ def read_json(path: Path) -> Optional[Dict[str, Any]]:
     if not path.exists():
         return None
     try:
-        return json.loads(path.read_text())
+        return _loads(path.read_bytes())
     except Exception as e:
         log.error("Failed to read %s: %s", path, e)
         return None
 
 
+def read_json_cached(path: Path) -> Optional[Dict[str, Any]]:
+    """Like read_json, but reuses the parsed document while the file's mtime/size are unchanged.
+    The returned dict is shared between callers; treat it as read-only.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        _json_cache.pop(path, None)
+        return None
+    key = (st.st_mtime_ns, st.st_size)
+    hit = _json_cache.get(path)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    data = read_json(path)
+    if data is not None:
+        _json_cache[path] = (key, data)
+    return data
+
+
+def preload_personas() -> int:
+    """Parse every persona file (and the active map) in one directory pass to warm
+    read_json_cached. Returns the number of personas loaded.
+    """
+    loaded = 0
+    try:
+        with os.scandir(PERSONA_DIR) as it:
+            for entry in it:
+                if not entry.name.endswith(".json") or not entry.is_file():
+                    continue
+                path = PERSONA_DIR / entry.name
+                st = entry.stat()
+                data = read_json(path)
+                if data is not None:
+                    _json_cache[path] = ((st.st_mtime_ns, st.st_size), data)
+                    loaded += 1
+    except OSError as e:
+        log.error("Failed to scan %s: %s", PERSONA_DIR, e)
+    read_json_cached(STATE_FILE)
+    return loaded
+
+
+def invalidate(path: Optional[Path] = None) -> None:
+    """Forget cached documents for path (or all paths when None)."""
+    if path is None:
+        _json_cache.clear()
+    else:
+        _json_cache.pop(path, None)
+
+
 def write_json(path: Path, data: Dict[str, Any]) -> None:
+    # Write a sibling temp file and rename it over path, so a crash never leaves a truncated doc
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
     try:
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(data, indent=2))
+        tmp.write_bytes(_dumps(data))
+        os.replace(tmp, path)
     except Exception as e:
         log.error("Failed to write %s: %s", path, e)
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+    finally:
+        invalidate(path)
+        if path.parent == PERSONA_DIR:
+            _forget_persona_list()
+
+
+async def aread_json(path: Path) -> Optional[Dict[str, Any]]:
+    """read_json_cached in a worker thread; same shared, read-only result."""
+    return await asyncio.to_thread(read_json_cached, path)
+
+
+async def awrite_json(path: Path, data: Dict[str, Any]) -> None:
+    await asyncio.to_thread(write_json, path, data)
+
+
+def _forget_persona_list() -> None:
+    global _personas_cache
+    _personas_cache = None
 
 
 def list_personas() -> list[int]:
+    """Sorted persona ids; rescans PERSONA_DIR only when its mtime changes."""
+    global _personas_cache
+    try:
+        mtime = PERSONA_DIR.stat().st_mtime_ns
+    except OSError:
+        return []
+    hit = _personas_cache
+    if hit is not None and hit[0] == mtime:
+        return list(hit[1])
     ids: list[int] = []
     for p in PERSONA_DIR.glob("*.json"):
         try:
             ids.append(int(p.stem))
         except ValueError:
             continue
-    return sorted(ids)
+    ids.sort()
+    _personas_cache = (mtime, ids)
+    return list(ids)
 
 
 def delete_persona(user_id: int) -> bool:
     p = persona_path(user_id)
+    invalidate(p)
+    _forget_persona_list()
     if p.exists():
         try:
             p.unlink()
@@ -56,21 +168,66 @@ def delete_persona(user_id: int) -> bool:
     return False
 
 
+def delete_index_files(user_id: int) -> int:
+    """Remove every index file for user_id (<id>.idx and any <id>.idx.* sidecar); returns the count."""
+    prefix = f"{user_id}.idx"
+    removed = 0
+    try:
+        with os.scandir(INDEX_DIR) as it:
+            for entry in it:
+                if entry.name == prefix or entry.name.startswith(prefix + "."):
+                    try:
+                        os.unlink(entry.path)
+                        removed += 1
+                    except FileNotFoundError:
+                        pass
+                    except OSError as e:
+                        log.error("Failed to delete %s: %s", entry.path, e)
+    except OSError as e:
+        log.error("Failed to scan %s: %s", INDEX_DIR, e)
+    return removed
+
+
+# (state doc it was built from, channel_id(str) -> user_id(int))
+_active_map: Optional[Tuple[Dict[str, Any], Dict[str, int]]] = None
+
+
 def get_active_persona_map() -> Dict[str, int]:
-    data = read_json(STATE_FILE) or {}
-    # map: channel_id(str) -> user_id(int)
-    return {k: int(v) for k, v in data.items()}
+    """channel_id(str) -> user_id(int). Rebuilt only when the state file changes; the returned
+    dict is shared between callers, so treat it as read-only."""
+    global _active_map
+    data = read_json_cached(STATE_FILE) or {}
+    hit = _active_map
+    if hit is not None and hit[0] is data:
+        return hit[1]
+    mapping = {k: int(v) for k, v in data.items()}
+    _active_map = (data, mapping)
+    return mapping
 
 
-def set_active_persona(channel_id: int, user_id: int) -> None:
-    data = get_active_persona_map()
-    data[str(channel_id)] = int(user_id)
-    write_json(STATE_FILE, data)
+def reload_active_persona_map() -> Dict[str, int]:
+    """Re-read STATE_FILE, e.g. after it was edited outside the bot."""
+    global _active_map
+    _active_map = None
+    invalidate(STATE_FILE)
+    return get_active_persona_map()
 
 
-def clear_active_persona(channel_id: int) -> None:
-    data = get_active_persona_map()
-    if str(channel_id) in data:
-        del data[str(channel_id)]
+# Serializes the read-modify-write of STATE_FILE; callers run these off the loop.
+_state_lock = threading.Lock()
+
+
+def set_active_persona(channel_id: int, user_id: int) -> None:
+    with _state_lock:
+        data = dict(get_active_persona_map())
+        data[str(channel_id)] = int(user_id)
         write_json(STATE_FILE, data)
 
+
+def clear_active_persona(channel_id: int) -> None:
+    with _state_lock:
+        data = get_active_persona_map()
+        if str(channel_id) in data:
+            data = dict(data)
+            del data[str(channel_id)]
+            write_json(STATE_FILE, data)
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Allow up to `rate` acquisitions per `per` seconds; callers wait for a token."""
+
+    def __init__(self, rate: int = 5, per: float = 2.0):
+        self.rate = max(1, int(rate))
+        self.per = max(0.001, float(per))
+        self._tokens = float(self.rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(float(self.rate), self._tokens + (now - self._updated) * self.rate / self.per)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) * self.per / self.rate)
+
+    def drain(self) -> None:
+        # Server says the bucket is exhausted; stop handing out tokens until refilled
+        self._refill()
+        self._tokens = 0.0
@@ -1,16 +1,35 @@
 from __future__ import annotations
 
+import asyncio
 from typing import Dict, Optional
 
 import discord
 
 from .logging import get_logger
+from .ratelimit import AsyncTokenBucket
 
 
 log = get_logger(__name__)
 
 
 _cache: Dict[int, discord.Webhook] = {}
+# Discord's per-webhook bucket is 5 requests / 2s; pace sends across all channels/personas
+_buckets: Dict[int, AsyncTokenBucket] = {}
+
+
+def _bucket(webhook_id: int) -> AsyncTokenBucket:
+    b = _buckets.get(webhook_id)
+    if b is None:
+        b = AsyncTokenBucket(rate=5, per=2.0)
+        _buckets[webhook_id] = b
+    return b
+
+
+def _reset_after(e: discord.HTTPException) -> float:
+    try:
+        return max(0.0, float(e.response.headers.get("X-RateLimit-Reset-After", "1")))
+    except Exception:
+        return 1.0
 
 
 async def get_or_create_channel_webhook(channel: discord.TextChannel | discord.Thread) -> Optional[discord.Webhook]:
@@ -61,8 +80,18 @@ async def send_via_webhook(
             kwargs["username"] = username
         if avatar_url is not None:
             kwargs["avatar_url"] = avatar_url
-        msg = await wh.send(content, **kwargs)
-        return msg
+        bucket = _bucket(wh.id)
+        await bucket.acquire()
+        try:
+            return await wh.send(content, **kwargs)
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            # Rate limited despite pacing (shared bucket); wait exactly as instructed and retry once
+            bucket.drain()
+            await asyncio.sleep(_reset_after(e))
+            await bucket.acquire()
+            return await wh.send(content, **kwargs)
     except Exception as e:
         log.info("Webhook send failed in %s: %s", channel, e)
         return None
@@ -0,0 +1,47 @@
+import asyncio
+import unittest
+import warnings
+
+from src.utils.concurrency import sem_gather
+
+
+class SemGatherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_results_keep_input_order(self):
+        async def job(i: int) -> int:
+            await asyncio.sleep(0.01 * (3 - i))
+            return i
+
+        self.assertEqual(await sem_gather(2, *(job(i) for i in range(4))), [0, 1, 2, 3])
+
+    async def test_failure_cancels_siblings_and_closes_unstarted(self):
+        started: list[int] = []
+        cancelled: list[int] = []
+
+        async def slow(i: int) -> int:
+            started.append(i)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(i)
+                raise
+            return i
+
+        async def boom() -> int:
+            started.append(-1)
+            await asyncio.sleep(0)
+            raise ValueError("boom")
+
+        aws = [slow(0), boom(), slow(2), slow(3)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", RuntimeWarning)
+            with self.assertRaises(ValueError):
+                await sem_gather(2, *aws)
+        self.assertEqual(started, [0, -1])
+        self.assertEqual(cancelled, [0])
+        # Coroutines that never started were closed, so none is left "never awaited"
+        for aw in aws:
+            self.assertIsNone(aw.cr_frame)
+
+
+if __name__ == "__main__":
+    unittest.main()